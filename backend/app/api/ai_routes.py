@@ -16,7 +16,7 @@ import uuid
 import re
 
 from fastapi import APIRouter, File, Form, Request, UploadFile, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from PIL import Image, UnidentifiedImageError
 import numpy as np
 import torch
@@ -563,7 +563,8 @@ async def reconstruct_scene(request: Request, files: list[UploadFile] = File(...
     if not model: return _error(503, "Scene-3D not loaded", request_id)
     images = [_read_upload_as_rgb(await f.read()) for f in files[:50]]
     result = model.reconstruct(images)
-    return JSONResponse(content={"request_id": request_id, **result})
+    # Облако точек — ndarray: orjson сериализует его на уровне C, без .tolist()
+    return ORJSONResponse(content={"request_id": request_id, **result})
 
 @router.get("/ai/models")
 async def list_models():
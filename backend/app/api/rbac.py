@@ -78,13 +78,23 @@ def require_role(min_role: str):
 
 
 @lru_cache(maxsize=1)
-def _compiled_endpoint_patterns() -> list[tuple[str, re.Pattern[str], str]]:
-    compiled: list[tuple[str, re.Pattern[str], str]] = []
+def _compiled_endpoint_patterns() -> dict[str, tuple[re.Pattern[str], list[str]]]:
+    """Per-method alternation of all endpoint patterns: one regex match per lookup.
+
+    Alternatives keep ENDPOINT_ROLES order, so the first listed match wins;
+    group ``i`` of a match is the ``i - 1``-th role in the list.
+    """
+    grouped: dict[str, list[tuple[str, str]]] = {}
     for key, role in ENDPOINT_ROLES.items():
         method, path = key.split(" ", 1)
-        # convert /api/users/{id}/x => ^/api/users/[^/]+/x$
-        regex_path = "^" + re.sub(r"\{[^/{}]+\}", r"[^/]+", path.rstrip("/")) + "$"
-        compiled.append((method.upper(), re.compile(regex_path), role))
+        # convert /api/users/{id}/x => /api/users/[^/]+/x
+        regex_path = re.sub(r"\{[^/{}]+\}", r"[^/]+", path.rstrip("/"))
+        grouped.setdefault(method.upper(), []).append((regex_path, role))
+
+    compiled: dict[str, tuple[re.Pattern[str], list[str]]] = {}
+    for method, entries in grouped.items():
+        alternation = "|".join(f"({regex_path})" for regex_path, _ in entries)
+        compiled[method] = (re.compile(f"^(?:{alternation})$"), [role for _, role in entries])
     return compiled
 
 
@@ -96,10 +106,12 @@ def endpoint_required_role(method: str, path: str) -> str | None:
     if role is not None:
         return role
 
-    for endpoint_method, pattern, endpoint_role in _compiled_endpoint_patterns():
-        if endpoint_method == method.upper() and pattern.match(normalized_path):
-            return endpoint_role
-    return None
+    compiled = _compiled_endpoint_patterns().get(method.upper())
+    if compiled is None:
+        return None
+    pattern, roles = compiled
+    match = pattern.match(normalized_path)
+    return roles[match.lastindex - 1] if match else None
 
 
 require_viewer = require_role(UserRole.viewer.value)
@@ -125,26 +125,31 @@ def normalize_job_params(operation: str, params: Dict[str, Any]) -> Tuple[str, L
     raise HTTPException(status_code=422, detail=f"Unsupported operation: {operation}")
 
 
+# Celery state -> (status, default progress, is_final, poll_after_ms); built once, not per poll
+TASK_STATE_MAP: Dict[str, Tuple[str, int, bool, int]] = {
+    "PENDING": ("pending", 0, False, 700),
+    "RECEIVED": ("queued", 0, False, 700),
+    "STARTED": ("running", 1, False, 700),
+    "PROGRESS": ("running", 0, False, 700),
+    "SUCCESS": ("done", 100, True, 0),
+    "FAILURE": ("failed", 100, True, 0),
+    "REVOKED": ("canceled", 100, True, 0),
+    "RETRY": ("retry", 0, False, 900),
+}
+UNKNOWN_TASK_STATE = ("unknown", 0, False, 1000)
+
+
 def _to_task_status(async_result: Any, task_id: str) -> Dict[str, Any]:
     state = str(getattr(async_result, "state", "UNKNOWN") or "UNKNOWN").upper()
-    payload: Dict[str, Any] = {"task_id": task_id, "raw_state": state}
-    state_map = {
-        "PENDING": ("pending", 0, False, 700),
-        "RECEIVED": ("queued", 0, False, 700),
-        "STARTED": ("running", 1, False, 700),
-        "PROGRESS": ("running", 0, False, 700),
-        "SUCCESS": ("done", 100, True, 0),
-        "FAILURE": ("failed", 100, True, 0),
-        "REVOKED": ("canceled", 100, True, 0),
-        "RETRY": ("retry", 0, False, 900),
-    }
-    status, default_progress, is_final, poll_after_ms = state_map.get(state, ("unknown", 0, False, 1000))
-    payload.update({
+    status, default_progress, is_final, poll_after_ms = TASK_STATE_MAP.get(state, UNKNOWN_TASK_STATE)
+    payload: Dict[str, Any] = {
+        "task_id": task_id,
+        "raw_state": state,
         "status": status,
         "progress": default_progress,
         "is_final": is_final,
         "poll_after_ms": poll_after_ms,
-    })
+    }
 
     if state == "PROGRESS":
         info = getattr(async_result, "info", {}) or {}
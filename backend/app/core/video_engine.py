@@ -106,8 +106,8 @@ class LocalVideoEngine:
         # Применяем нужные ИИ-фильтры не выходя из видеокарты!
         for op in operations:
             if op == "denoise":
-                from app.models.denoise import _load_nafnet
-                model = self._manage_vram("nafnet", _load_nafnet)
+                from app.models.nafnet import load_nafnet
+                model = self._manage_vram("nafnet", lambda: load_nafnet(self.device))
                 tensor = model(tensor)  # Предполагается, что обертка поддерживает батчи
 
             # Добавьте сюда вызовы upscale, face_enhance и т.д.
@@ -1,24 +1,63 @@
-import torch
+"""NAFNet denoise entry points for the queue and the video engine.
+
+The model itself lives in :mod:`app.models.nafnet`; this module only adapts
+it to the byte-level API used by Celery tasks.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import threading
+
 import numpy as np
+from PIL import Image
+import torch
+
+from .nafnet import NAFNet, load_nafnet
+from .video_pipeline import encode_frame
+
+logger = logging.getLogger(__name__)
+
+_nafnet_model: NAFNet | None = None
+# Video frames are denoised from worker threads: load the weights only once
+_nafnet_lock = threading.Lock()
+
+
+def _load_nafnet() -> NAFNet:
+    global _nafnet_model
+    if _nafnet_model is None:
+        with _nafnet_lock:
+            if _nafnet_model is None:
+                _nafnet_model = load_nafnet("cuda" if torch.cuda.is_available() else "cpu")
+    return _nafnet_model
+
+
+def _denoise_batch(tensor: torch.Tensor, level: str = "medium") -> torch.Tensor:
+    """model_fn for :func:`app.queue.batch.process_batch`: one forward per batch."""
+    return _load_nafnet()(tensor, level)
+
+
+def denoise_frame(frame: np.ndarray, level: str = "medium") -> bytes:
+    """Denoise a raw RGB video frame; the PNG encode is the only codec pass.
+
+    Synchronous: :func:`app.models.video_pipeline.process_video_frames` calls
+    it from worker threads.
+    """
+    return encode_frame(_load_nafnet().denoise(frame, level=level), "png")
+
+
+def denoise_image_sync(image: bytes, level: str = "medium") -> bytes:
+    try:
+        img_np = np.array(Image.open(io.BytesIO(image)).convert("RGB"))
+        output_np = _load_nafnet().denoise(img_np, level=level)
+        buf = io.BytesIO()
+        Image.fromarray(output_np).save(buf, format="PNG")
+        return buf.getvalue()
+    except Exception as exc:  # pragma: no cover - depends on optional heavy deps
+        logger.warning("NAFNet unavailable, fallback to original image: %s", exc)
+        return image
+
 
-class DenoiseModel:
-    def __init__(self, device="cuda"):
-        self.device = device
-        # Загрузка реальной модели (заглушка для примера)
-        self.model = self._load_nafnet()
-
-    def _load_nafnet(self):
-        # Здесь ваша логика загрузки .pth файла
-        return lambda x: x # Пока просто возвращаем вход
-
-    def __call__(self, tensor: torch.Tensor):
-        """
-        ВХОД: torch.Tensor (B, C, H, W) в GPU
-        ВЫХОД: torch.Tensor (B, C, H, W) в GPU
-        """
-        with torch.no_grad():
-            # Нативная обработка в GPU без выхода в NumPy!
-            return self.model(tensor)
-
-def _load_nafnet():
-    return DenoiseModel()
\ No newline at end of file
+async def denoise_image(image: bytes, level: str = "medium") -> bytes:
+    return denoise_image_sync(image, level)
@@ -7,7 +7,7 @@ from typing import Any, Dict, List
 import numpy as np
 
 
-async def detect_faces(image: bytes) -> List[Dict[str, Any]]:
+def detect_faces_sync(image: bytes) -> List[Dict[str, Any]]:
     try:
         from retinaface import RetinaFace
     except ImportError:
@@ -53,6 +53,10 @@ async def detect_faces(image: bytes) -> List[Dict[str, Any]]:
     return result
 
 
+async def detect_faces(image: bytes) -> List[Dict[str, Any]]:
+    return detect_faces_sync(image)
+
+
 def _detect_faces_opencv(image: bytes) -> List[Dict[str, Any]]:
     try:
         import cv2
@@ -22,7 +22,7 @@ def _load_yolo():
         return None
 
 
-async def detect_objects(
+def detect_objects_sync(
     image: bytes,
     scene_threshold: Optional[float] = None,
     temporal_window: Optional[int] = None,
@@ -71,3 +71,11 @@ async def detect_objects(
                 }
             )
     return output
+
+
+async def detect_objects(
+    image: bytes,
+    scene_threshold: Optional[float] = None,
+    temporal_window: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    return detect_objects_sync(image, scene_threshold=scene_threshold, temporal_window=temporal_window)
@@ -12,15 +12,17 @@ from .download_models import download_restoreformer_pp
 
 logger = logging.getLogger(__name__)
 
-_restoreformer_path: Path | None = None
+# (path, size): stat()ed once, not on every request that hits the placeholder check
+_restoreformer_info: tuple[Path, int] | None = None
 _gfpgan_model = None
 
 
-def _ensure_restoreformer_weights() -> Path:
-    global _restoreformer_path
-    if _restoreformer_path is None:
-        _restoreformer_path = download_restoreformer_pp()
-    return _restoreformer_path
+def _ensure_restoreformer_weights() -> tuple[Path, int]:
+    global _restoreformer_info
+    if _restoreformer_info is None:
+        path = download_restoreformer_pp()
+        _restoreformer_info = (path, path.stat().st_size)
+    return _restoreformer_info
 
 
 def _load_gfpgan():
@@ -28,8 +30,8 @@ def _load_gfpgan():
     if _gfpgan_model is not None:
         return _gfpgan_model
 
-    weights_path = _ensure_restoreformer_weights()
-    if weights_path.stat().st_size < 1_000_000:
+    weights_path, weights_size = _ensure_restoreformer_weights()
+    if weights_size < 1_000_000:
         return None
 
     from gfpgan import GFPGANer
@@ -46,7 +48,7 @@ def _load_gfpgan():
     return model
 
 
-async def enhance_face(image: bytes) -> bytes:
+def enhance_face_sync(image: bytes) -> bytes:
     try:
         model = _load_gfpgan()
         if model is None:
@@ -78,3 +80,7 @@ async def enhance_face(image: bytes) -> bytes:
     except Exception as exc:  # pragma: no cover - depends on optional heavy deps
         logger.warning("GFPGAN unavailable, fallback to original image: %s", exc)
         return image
+
+
+async def enhance_face(image: bytes) -> bytes:
+    return enhance_face_sync(image)
@@ -3,6 +3,7 @@ import torch
 import numpy as np
 import cv2
 import logging
+from scipy import fft as sp_fft
 from pathlib import Path
 
 # Существующие импорты SAM 2...
@@ -14,9 +15,51 @@ try:
 except ImportError:
     SAM_AVAILABLE = False
 
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, boundscheck=False, cache=True)
+    def _mask_bounds(mask):
+        """
+        Один потоковый проход по маске: min/max по строкам считаются
+        параллельно (локально для каждой строки), затем сводятся.
+        Возвращает (x1, y1, x2, y2); x2 == -1, если маска пустая.
+        """
+        h, w = mask.shape
+        row_x1 = np.full(h, w, dtype=np.int64)
+        row_x2 = np.full(h, -1, dtype=np.int64)
+        for y in prange(h):
+            for x in range(w):
+                if mask[y, x]:
+                    row_x1[y] = x
+                    break
+            if row_x1[y] < w:
+                for x in range(w - 1, -1, -1):
+                    if mask[y, x]:
+                        row_x2[y] = x
+                        break
+
+        x1, y1, x2, y2 = w, h, -1, -1
+        for y in range(h):
+            if row_x2[y] >= 0:
+                if y < y1:
+                    y1 = y
+                y2 = y
+                if row_x1[y] < x1:
+                    x1 = row_x1[y]
+                if row_x2[y] > x2:
+                    x2 = row_x2[y]
+        return x1, y1, x2, y2
+
+
 class ForensicHypothesisEngine:
     def __init__(self):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -124,10 +167,13 @@ class ForensicHypothesisEngine:
         """
         Вычисляет координаты кропа вокруг маски объекта с учетом отступов.
         """
-        y, x = np.where(mask)
-        if len(x) == 0: return None
-
-        x1, y1, x2, y2 = x.min(), y.min(), x.max(), y.max()
+        if NUMBA_AVAILABLE and mask.ndim == 2:
+            x1, y1, x2, y2 = _mask_bounds(np.ascontiguousarray(mask))
+            if x2 < 0: return None
+        else:
+            y, x = np.where(mask)
+            if len(x) == 0: return None
+            x1, y1, x2, y2 = x.min(), y.min(), x.max(), y.max()
         w, h = x2 - x1, y2 - y1
 
         # Добавляем контекст вокруг объекта
@@ -165,23 +211,19 @@ def apply_blind_deconvolution(image_np: np.ndarray, intensity: int = 50, angle:
     result_channels = []
     channels = cv2.split(image_np) if len(image_np.shape) == 3 else [gray]
 
+    # Kernel spectrum and Wiener filter are identical for every channel.
+    # The signal is real, so the half-spectrum rfft2/irfft2 pair is enough.
+    shape = channels[0].shape
+    kernel_fft = sp_fft.rfft2(kernel, s=shape, workers=-1)
+
+    # Wiener filter: H* / (|H|^2 + NSR)
+    nsr = 10.0 / max(1, intensity)  # noise-to-signal ratio
+    wiener = np.conj(kernel_fft) / (np.abs(kernel_fft) ** 2 + nsr)
+
     for ch in channels:
-        ch_f = np.float64(ch)
-        # FFT of image and kernel
-        img_fft = np.fft.fft2(ch_f)
-        kernel_padded = np.zeros_like(ch_f)
-        ky, kx = kernel.shape
-        kernel_padded[:ky, :kx] = kernel
-        kernel_fft = np.fft.fft2(kernel_padded)
-
-        # Wiener filter: H* / (|H|^2 + NSR)
-        nsr = 10.0 / max(1, intensity)  # noise-to-signal ratio
-        kernel_conj = np.conj(kernel_fft)
-        wiener = kernel_conj / (np.abs(kernel_fft) ** 2 + nsr)
-
-        restored = np.fft.ifft2(img_fft * wiener)
-        restored = np.abs(restored)
-        restored = np.clip(restored, 0, 255).astype(np.uint8)
+        img_fft = sp_fft.rfft2(np.float64(ch), workers=-1)
+        restored = sp_fft.irfft2(img_fft * wiener, s=shape, workers=-1)
+        restored = np.clip(restored, 0, 255, out=restored).astype(np.uint8, copy=False)
         result_channels.append(restored)
 
     if len(result_channels) == 1:
@@ -2,17 +2,37 @@
 NAFNet Denoising — удаление сенсорного шума и артефактов сжатия.
 """
 import logging
+import os
+import threading
 import numpy as np
 import torch
 import cv2
 from pathlib import Path
 
+__all__ = ["NAFNet", "load_nafnet"]
+
 logger = logging.getLogger(__name__)
 
+cv2.setUseOptimized(True)
+cv2.setNumThreads(max(1, (os.cpu_count() or 2) // 2))
+
+# (h, searchWindowSize, templateWindowSize) для NlMeans-фоллбека.
+# Окно поиска — основная цена алгоритма, поэтому растёт вместе с уровнем.
+NLMEANS_PARAMS = {
+    'light': (5, 11, 3),
+    'medium': (5, 15, 5),
+    'heavy': (10, 21, 7),
+}
+
 class NAFNet:
     def __init__(self, model_path: str, device: str = 'cuda'):
         self.device = device if torch.cuda.is_available() else 'cpu'
         self.model = self._load_model(model_path)
+        # Pinned-буферы хоста по форме кадра: H2D копия идёт через DMA
+        # асинхронно и перекрывается с инференсом предыдущего кадра.
+        # У каждого потока свои: process_video_frames гонит кадры одной
+        # формы параллельно через asyncio.to_thread.
+        self._pin = threading.local()
 
     def _load_model(self, model_path: str):
         try:
@@ -40,9 +60,9 @@ class NAFNet:
     def denoise(self, image: np.ndarray, level: str = 'medium') -> np.ndarray:
         if self.model == "fallback":
             # Идеальный Forensic-фоллбек без ИИ (работает всегда)
-            h = 10 if level == 'heavy' else 5
+            h, search, template = NLMEANS_PARAMS.get(level, NLMEANS_PARAMS['medium'])
             img_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            denoised = cv2.fastNlMeansDenoisingColored(img_bgr, None, h, h, 7, 21)
+            denoised = cv2.fastNlMeansDenoisingColored(img_bgr, None, h, h, template, search)
             return cv2.cvtColor(denoised, cv2.COLOR_BGR2RGB)
 
         tensor = self._preprocess(image)
@@ -50,18 +70,51 @@ class NAFNet:
             output = self.model(tensor)
         return self._postprocess(output)
 
+    def __call__(self, tensor: torch.Tensor, level: str = 'medium') -> torch.Tensor:
+        """Батч (B, C, H, W) в [0, 1] прямо на устройстве — для видео-движка и очереди."""
+        if self.model == "fallback":
+            frames = tensor.float().clamp(0, 1).mul(255).to(torch.uint8).permute(0, 2, 3, 1).cpu().numpy()
+            denoised = np.stack([self.denoise(frame, level) for frame in frames])
+            out = torch.from_numpy(denoised).permute(0, 3, 1, 2).to(tensor.device)
+            return out.to(tensor.dtype).div_(255.0)
+
+        with torch.inference_mode():
+            return self.model(tensor)
+
     def _preprocess(self, image: np.ndarray) -> torch.Tensor:
         # B, C, H, W + FP16
-        tensor = torch.from_numpy(image).float() / 255.0
-        tensor = tensor.permute(2, 0, 1).unsqueeze(0).to(self.device)
-        return tensor.half() if self.device == 'cuda' else tensor
+        if self.device != 'cuda':
+            tensor = torch.from_numpy(image).float() / 255.0
+            return tensor.permute(2, 0, 1).unsqueeze(0)
+
+        pin_buf = getattr(self._pin, "buf", None)
+        if pin_buf is None:
+            pin_buf = self._pin.buf = {}
+        key = image.shape
+        entry = pin_buf.get(key)
+        if entry is None:
+            # Не inference-тензор: буфер переживает вызов, и div_ над ним
+            # должен работать и вне inference_mode
+            with torch.inference_mode(False):
+                buf = torch.empty((1, 3, *image.shape[:2]), dtype=torch.float32, pin_memory=True)
+            entry = pin_buf[key] = (buf, torch.cuda.Event())
+        buf, copied = entry
+        # Буфер нельзя перезаписывать, пока предыдущая копия ещё в полёте
+        copied.synchronize()
+        np.copyto(buf.numpy()[0].transpose(1, 2, 0), image)
+        buf.div_(255.0)
+        tensor = buf.to(self.device, non_blocking=True)
+        copied.record()
+        return tensor.half()
 
     def _postprocess(self, tensor: torch.Tensor) -> np.ndarray:
-        tensor = tensor.float().squeeze(0).permute(1, 2, 0)
-        array = (tensor.cpu().numpy() * 255).clip(0, 255).astype(np.uint8)
-        return array
-
-    def load_nafnet(device: str = 'cuda') -> NAFNet:
-        from .model_paths import model_path
-        weights = model_path("nafnet")
-        return NAFNet(str(weights), device)
\ No newline at end of file
+        # clamp/mul/cast сливаются в один проход на устройстве,
+        # на хост уходит уже uint8 (в 4 раза меньше байт, чем float32)
+        tensor = tensor.clamp(0, 1).mul_(255).round_().to(torch.uint8)
+        return tensor.squeeze(0).permute(1, 2, 0).contiguous().cpu().numpy()
+
+
+def load_nafnet(device: str = 'cuda') -> NAFNet:
+    from .model_paths import model_path
+    weights = model_path("nafnet")
+    return NAFNet(str(weights), device)
@@ -1,18 +1,95 @@
 """
 Боевой модуль Real-ESRGAN для Super-Resolution (x2, x4, x8).
 """
+from __future__ import annotations
+
 import logging
 import numpy as np
 import torch
 import cv2
 from pathlib import Path
 
+from .inference_opts import compile_for_inference
+
 logger = logging.getLogger(__name__)
 
+# Тайлы режутся в памяти хоста: RealESRGANer.pre_process() грузит на GPU
+# всё изображение целиком даже при tile>0, и 4K ловит OOM до инференса.
+TILE_SIZE = 512
+TILE_OVERLAP = 32
+EMPTY_CACHE_EVERY = 16
+
+
+def _tile_starts(length: int) -> list[int]:
+    if length <= TILE_SIZE:
+        return [0]
+    step = TILE_SIZE - TILE_OVERLAP
+    starts = list(range(0, length - TILE_SIZE, step))
+    starts.append(length - TILE_SIZE)
+    return starts
+
+
+def _axis_weights(starts: list[int], tile: int, overlap: int, length: int) -> list[np.ndarray]:
+    """Веса тайлов вдоль одной оси выхода; в каждой точке их сумма ровно 1.
+
+    Соседи сменяют друг друга линейной рампой шириной ``overlap`` посередине
+    общего участка, вне рампы пиксель целиком принадлежит одному тайлу.
+    """
+    weights = []
+    for start in starts:
+        w = np.zeros(length, dtype=np.float32)
+        w[start:start + tile] = 1.0
+        weights.append(w)
+    for k in range(len(starts) - 1):
+        shared = starts[k] + tile - starts[k + 1]
+        band = min(overlap, shared)
+        lo = starts[k + 1] + (shared - band) // 2
+        fade = np.linspace(0.0, 1.0, band + 2, dtype=np.float32)[1:-1]
+        weights[k][lo:lo + band] = 1.0 - fade
+        weights[k][lo + band:] = 0.0
+        weights[k + 1][:lo] = 0.0
+        weights[k + 1][lo:lo + band] = fade
+    return weights
+
+
+def _blend_into(dst: np.ndarray, src: np.ndarray, alpha: np.ndarray) -> None:
+    """dst = dst·(1−alpha) + src·alpha с округлением обратно в uint8."""
+    mixed = dst.astype(np.float32)
+    mixed += (src.astype(np.float32) - mixed) * alpha[..., np.newaxis]
+    dst[...] = np.clip(mixed, 0, 255, out=mixed).round(out=mixed)
+
+
+def _paste_tile(dst, src, cur_y, prev_y, cur_x, prev_x) -> None:
+    """Влить тайл в uint8-выход бегущим взвешенным средним (обход построчно).
+
+    ``cur_*`` — веса тайла по осям, ``prev_*`` — сумма весов уже записанных
+    тайлов выше (по y) и левее в том же ряду (по x). Где тайл единственный,
+    пиксели просто копируются; float32 считается только на полосах
+    перекрытия с соседями сверху и слева.
+    """
+    rows, cols = np.flatnonzero(cur_y), np.flatnonzero(cur_x)
+    r0, r1 = rows[0], rows[-1] + 1
+    c0, c1 = cols[0], cols[-1] + 1
+    rt = r0 + np.count_nonzero(prev_y[r0:r1])
+    cl = c0 + np.count_nonzero(prev_x[c0:c1])
+
+    dst[rt:r1, cl:c1] = src[rt:r1, cl:c1]
+    if rt > r0:
+        # Выше уже лежит целый ряд тайлов, его веса по x в сумме дают 1
+        w_new = np.outer(cur_y[r0:rt], cur_x[c0:c1])
+        alpha = w_new / (prev_y[r0:rt, np.newaxis] + np.outer(cur_y[r0:rt], prev_x[c0:c1]) + w_new)
+        _blend_into(dst[r0:rt, c0:c1], src[r0:rt, c0:c1], alpha)
+    if cl > c0:
+        alpha = cur_x[c0:cl] / (prev_x[c0:cl] + cur_x[c0:cl])
+        _blend_into(dst[rt:r1, c0:cl], src[rt:r1, c0:cl], np.broadcast_to(alpha, (r1 - rt, cl - c0)))
+
+
 class RealESRGAN:
     def __init__(self, model_path: str, device: str = 'cuda'):
         self.device = device if torch.cuda.is_available() else 'cpu'
         self.model = self._load_model(model_path)
+        # (graph, static_in, static_out) для полноразмерных тайлов TILE_SIZE²
+        self._tile_graph = self._capture_tile_graph()
 
     def _load_model(self, model_path: str):
         try:
@@ -26,18 +103,70 @@ class RealESRGAN:
                 scale=4,
                 model_path=model_path,
                 model=model,
-                tile=512, # Разбиваем на тайлы, чтобы не словить OOM на 4K
-                tile_pad=10,
+                tile=0,  # Тайлинг делает upscale() на стороне хоста
+                tile_pad=0,
                 pre_pad=0,
                 half=(self.device == 'cuda'), # FP16 для ускорения в 2 раза
                 device=self.device,
             )
+            # CUDA graph для тайлов захватываем сами (_capture_tile_graph),
+            # поэтому Inductor — без собственных cudagraphs
+            upscaler.model = compile_for_inference(upscaler.model, self.device, mode="default")
             logger.info(f"Real-ESRGAN успешно загружен в {self.device.upper()}")
             return upscaler
         except Exception as e:
             logger.error(f"Ошибка загрузки Real-ESRGAN: {e}")
             return None
 
+    def _capture_tile_graph(self):
+        """
+        Все внутренние тайлы одной формы (1, 3, TILE_SIZE, TILE_SIZE) — граф
+        захватывается один раз и дальше только переигрывается, без сотен
+        запусков ядер RRDBNet на каждый тайл. Краевые тайлы другой формы
+        идут обычным путём через enhance().
+        """
+        if self.device != 'cuda' or self.model is None:
+            return None
+        try:
+            net = self.model.model
+            static_in = torch.zeros(
+                (1, 3, TILE_SIZE, TILE_SIZE), dtype=torch.float16, device='cuda'
+            ).contiguous(memory_format=torch.channels_last)
+
+            # Форма фиксирована: автотюнинг cuDNN только здесь, выбранные
+            # алгоритмы запекаются в граф. Прогрев на отдельном стриме, как
+            # требует захват графа
+            with torch.backends.cudnn.flags(enabled=True, benchmark=True):
+                side = torch.cuda.Stream()
+                side.wait_stream(torch.cuda.current_stream())
+                with torch.inference_mode(), torch.cuda.stream(side):
+                    for _ in range(3):
+                        net(static_in)
+                torch.cuda.current_stream().wait_stream(side)
+
+                graph = torch.cuda.CUDAGraph()
+                with torch.inference_mode(), torch.cuda.graph(graph):
+                    static_out = net(static_in)
+            return graph, static_in, static_out
+        except Exception as e:
+            logger.warning(f"CUDA graph для тайлов недоступен, обычный путь: {e}")
+            return None
+
+    def _enhance_tile_graph(self, tile_bgr: np.ndarray, scale: int) -> np.ndarray:
+        """Тот же результат, что RealESRGANer.enhance(tile), через replay графа."""
+        graph, static_in, static_out = self._tile_graph
+        tile = torch.from_numpy(np.ascontiguousarray(tile_bgr[:, :, ::-1])).to('cuda', non_blocking=True)
+        tile = tile.unsqueeze(0).permute(0, 3, 1, 2).contiguous(memory_format=torch.channels_last)
+        static_in.copy_(tile.to(torch.float16).mul_(1 / 255.0))
+        graph.replay()
+
+        out = static_out[0].clamp(0, 1).mul(255.0).round().to(torch.uint8).permute(1, 2, 0)
+        out_bgr = np.ascontiguousarray(out.cpu().numpy()[:, :, ::-1])
+        if scale != self.model.scale:
+            size = int(TILE_SIZE * scale)
+            out_bgr = cv2.resize(out_bgr, (size, size), interpolation=cv2.INTER_LANCZOS4)
+        return out_bgr
+
     def upscale(self, image: np.ndarray, scale: int = 2) -> np.ndarray:
         if self.model is None:
             logger.warning("Модель не загружена. Возврат исходника.")
@@ -45,16 +174,62 @@ class RealESRGAN:
 
         try:
             # Модель работает с BGR форматом (OpenCV)
-            img_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            # RGB<->BGR — это просто разворот каналов: view без копии,
+            # тайлы всё равно копируются в непрерывные массивы
+            img_bgr = image[:, :, ::-1]
 
-            with torch.inference_mode():
-                output_bgr, _ = self.model.enhance(img_bgr, outscale=scale)
+            with torch.inference_mode(), torch.autocast(
+                device_type='cuda', dtype=torch.float16, enabled=(self.device == 'cuda')
+            ):
+                output_bgr = self._upscale_tiled(img_bgr, scale)
 
-            return cv2.cvtColor(output_bgr, cv2.COLOR_BGR2RGB)
+            return np.ascontiguousarray(output_bgr[:, :, ::-1])
         except Exception as e:
             logger.error(f"Сбой при апскейле: {e}")
             return image
 
+    def _upscale_tiled(self, img_bgr: np.ndarray, scale: int) -> np.ndarray:
+        """
+        Апскейл по тайлам TILE_SIZE с перекрытием TILE_OVERLAP.
+        Пик VRAM ~ O(tile² · scale²) вместо O(всего изображения);
+        перекрытия смешиваются линейной рампой, чтобы не было швов.
+        Результат пишется сразу в uint8: полноразмерных float-буферов нет,
+        float только на полосах перекрытия.
+        """
+        h, w = img_bgr.shape[:2]
+        if h <= TILE_SIZE and w <= TILE_SIZE:
+            output, _ = self.model.enhance(np.ascontiguousarray(img_bgr), outscale=scale)
+            return output
+
+        out_h, out_w = int(h * scale), int(w * scale)
+        output = np.empty((out_h, out_w, 3), dtype=np.uint8)
+        overlap = int(TILE_OVERLAP * scale)
+        ys, xs = _tile_starts(h), _tile_starts(w)
+        oys, oxs = [int(y * scale) for y in ys], [int(x * scale) for x in xs]
+        wy = _axis_weights(oys, int(min(h, TILE_SIZE) * scale), overlap, out_h)
+        wx = _axis_weights(oxs, int(min(w, TILE_SIZE) * scale), overlap, out_w)
+        # Сумма весов тайлов, записанных раньше по порядку обхода
+        prev_wy = np.cumsum([np.zeros(out_h, dtype=np.float32)] + wy[:-1], axis=0)
+        prev_wx = np.cumsum([np.zeros(out_w, dtype=np.float32)] + wx[:-1], axis=0)
+
+        tiles = ((i, j) for i in range(len(ys)) for j in range(len(xs)))
+        for n, (i, j) in enumerate(tiles):
+            y0, x0 = ys[i], xs[j]
+            tile = img_bgr[y0:y0 + TILE_SIZE, x0:x0 + TILE_SIZE]
+            if self._tile_graph is not None and tile.shape[:2] == (TILE_SIZE, TILE_SIZE):
+                out = self._enhance_tile_graph(tile, scale)
+            else:
+                out, _ = self.model.enhance(np.ascontiguousarray(tile), outscale=scale)
+            oy, ox = oys[i], oxs[j]
+            th, tw = out.shape[:2]
+            rows, cols = slice(oy, oy + th), slice(ox, ox + tw)
+            _paste_tile(output[rows, cols], out, wy[i][rows], prev_wy[i][rows], wx[j][cols], prev_wx[j][cols])
+            del out
+            if self.device == 'cuda' and (n + 1) % EMPTY_CACHE_EVERY == 0:
+                torch.cuda.empty_cache()
+
+        return output
+
     def load_realesrgan(device: str = 'cuda') -> RealESRGAN:
         from .model_paths import model_path
         weights = model_path("realesrgan")
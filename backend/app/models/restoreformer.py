@@ -15,8 +15,11 @@ where marked. For demonstration purposes the current implementation
 simply returns the input image unchanged.
 """
 
+from __future__ import annotations
+
 from pathlib import Path
 
+from .inference_opts import compile_for_inference
 from .model_paths import model_path
 import numpy as np
 import torch
@@ -27,10 +30,14 @@ class RestoreFormer:
 
     def __init__(self, model_path: str, device: str = 'cuda'):
         self.device = device
+        # Pinned uint8 staging buffer for uploads, grown on demand
+        self._pin = None
         self.model = self._load_model(model_path)
         # Switch the model to eval mode if it defines eval()
         if hasattr(self.model, 'eval'):
             self.model.eval()
+        # No-op for the stub model; real nn.Modules get channels_last + compile.
+        self.model = compile_for_inference(self.model, self.device)
 
     def _load_model(self, model_path: str):
         """
@@ -68,22 +75,51 @@ class RestoreFormer:
             numpy array of the same shape containing the enhanced image.
         """
         tensor = self._preprocess(image)
-        with torch.no_grad():
+        # fp16 autocast only on CUDA: CPU half-precision kernels are slow
+        # and some of them are missing entirely.
+        with torch.inference_mode(), torch.autocast(
+            device_type='cuda', dtype=torch.float16, enabled=(self.device == 'cuda')
+        ):
             output = self.model(tensor)
         result = self._postprocess(output)
         return result
 
     def _preprocess(self, image: np.ndarray) -> torch.Tensor:
-        """Convert a numpy array (H, W, 3) into a PyTorch tensor."""
-        tensor = torch.from_numpy(image).float() / 255.0
-        tensor = tensor.permute(2, 0, 1).unsqueeze(0)
-        return tensor.to(self.device)
+        """Convert a numpy array (H, W, 3) into a PyTorch tensor.
+
+        On CUDA the uint8 pixels are uploaded as-is through a pinned staging
+        buffer (a quarter of the fp32 bytes) and scaled to [0, 1] on the GPU.
+        """
+        image = np.ascontiguousarray(image)
+        if self.device != 'cuda':
+            tensor = torch.from_numpy(image).permute(2, 0, 1).unsqueeze(0)
+            return tensor.float().div_(255.0)
+
+        # enhance() synchronizes in _postprocess, so the previous upload from
+        # the staging buffer has finished before it is overwritten here.
+        if self._pin is None or self._pin.numel() < image.size:
+            self._pin = torch.empty(image.size, dtype=torch.uint8, pin_memory=True)
+        staging = self._pin[:image.size].view(image.shape)
+        staging.copy_(torch.from_numpy(image))
+        tensor = staging.to(self.device, non_blocking=True)
+        # NHWC bytes relabelled as channels_last NCHW: no transpose on device,
+        # and the layout the compiled channels_last model expects.
+        tensor = tensor.unsqueeze(0).permute(0, 3, 1, 2).contiguous(memory_format=torch.channels_last)
+        return tensor.to(torch.float16).mul_(1 / 255.0)
 
     def _postprocess(self, tensor: torch.Tensor) -> np.ndarray:
-        """Convert a tensor back into a numpy array (H, W, 3)."""
-        tensor = tensor.squeeze(0).permute(1, 2, 0)
-        array = (tensor.cpu().numpy() * 255).clip(0, 255).astype(np.uint8)
-        return array
+        """Convert a tensor back into a numpy array (H, W, 3).
+
+        Scaling, clamping and the uint8 cast run as one elementwise pass on
+        the device, so the device-to-host copy moves a quarter of the bytes.
+        """
+        tensor = tensor.squeeze(0).permute(1, 2, 0).mul(255).clamp_(0, 255).to(torch.uint8)
+        if tensor.device.type != 'cuda':
+            return tensor.contiguous().numpy()
+        host = torch.empty(tensor.shape, dtype=torch.uint8, pin_memory=True)
+        host.copy_(tensor, non_blocking=True)
+        torch.cuda.current_stream().synchronize()
+        return host.numpy()
 
 
 def load_restoreformer(device: str = 'cuda') -> RestoreFormer:
@@ -78,8 +78,9 @@ class SceneReconstructor:
             output_format: 'pointcloud' | 'mesh' | 'gaussian'.
 
         Returns:
-            Dict with keys: points (Nx3), colors (Nx3), normals (Nx3),
-            camera_poses, metadata.
+            Dict with keys: points (Nx3 float32 ndarray), colors (Nx3 ndarray),
+            normals (Nx3), camera_poses, metadata. Arrays are left as numpy
+            so the API layer can serialize them without ``.tolist()``.
         """
         if len(images) < 2:
             return {"error": "Need at least 2 images", "points": [], "colors": []}
@@ -100,39 +101,15 @@ class SceneReconstructor:
         try:
             import cv2
 
-            poses = []
-            orb = cv2.ORB_create(nfeatures=2000)
-            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
-
-            prev_kp, prev_des = None, None
-            for i, img in enumerate(images):
-                gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-                kp, des = orb.detectAndCompute(gray, None)
-
-                pose = {
-                    "frame": i,
-                    "features_detected": len(kp),
-                    "rotation": np.eye(3).tolist(),
-                    "translation": [0.0, 0.0, float(i)],
-                }
-
-                if prev_des is not None and des is not None:
-                    matches = bf.match(prev_des, des)
-                    pose["matches_to_prev"] = len(matches)
-
-                    if len(matches) >= 8:
-                        src_pts = np.float32([prev_kp[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
-                        dst_pts = np.float32([kp[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
-                        E, mask = cv2.findEssentialMat(src_pts, dst_pts, method=cv2.RANSAC, prob=0.999, threshold=1.0)
-                        if E is not None:
-                            _, R, t, _ = cv2.recoverPose(E, src_pts, dst_pts)
-                            pose["rotation"] = R.tolist()
-                            pose["translation"] = t.flatten().tolist()
-
-                prev_kp, prev_des = kp, des
-                poses.append(pose)
-
-            return poses
+            orb, matcher, on_gpu = _make_orb(cv2)
+            if on_gpu:
+                try:
+                    return _match_poses(cv2, images, orb, matcher, on_gpu=True)
+                except cv2.error as exc:
+                    # GPU and CPU descriptors do not mix: redo the whole sequence on the CPU
+                    logger.warning("CUDA ORB failed, retrying on CPU: %s", exc)
+                    orb, matcher, _ = _make_orb(cv2, use_cuda=False)
+            return _match_poses(cv2, images, orb, matcher, on_gpu=False)
         except ImportError:
             return [{"frame": i, "features_detected": 0} for i in range(len(images))]
 
@@ -148,6 +125,10 @@ class SceneReconstructor:
             gray_l = cv2.cvtColor(left, cv2.COLOR_RGB2GRAY)
             gray_r = cv2.cvtColor(right, cv2.COLOR_RGB2GRAY)
 
+            disp = _stereo_sgm_cuda(cv2, gray_l, gray_r)
+            if disp is not None:
+                return _normalize_disparity(disp)
+
             stereo = cv2.StereoSGBM_create(
                 minDisparity=0,
                 numDisparities=128,
@@ -159,9 +140,7 @@ class SceneReconstructor:
                 speckleWindowSize=100,
                 speckleRange=32,
             )
-            disp = stereo.compute(gray_l, gray_r).astype(np.float32) / 16.0
-            disp = (disp - disp.min()) / (disp.max() - disp.min() + 1e-8)
-            return disp
+            return _normalize_disparity(stereo.compute(gray_l, gray_r))
         except ImportError:
             return np.zeros(left.shape[:2], dtype=np.float32)
 
@@ -193,31 +172,28 @@ class SceneReconstructor:
             import cv2
 
             pcd = o3d.geometry.PointCloud()
-            all_points = []
-            all_colors = []
-
-            for i in range(len(images) - 1):
-                depth = self.compute_depth_pair(images[i], images[i + 1])
-                h, w = depth.shape
+            samples = [
+                _sample_depth(self.compute_depth_pair(images[i], images[i + 1]), step=4, min_depth=0.01)
+                for i in range(len(images) - 1)
+            ]
+            points_np, colors_np = _alloc_cloud(samples)
+
+            start = 0
+            for i, (xs, ys, z, (h, w)) in enumerate(samples):
+                end = start + len(z)
                 fx = fy = max(h, w)
                 cx, cy = w / 2, h / 2
-                for y in range(0, h, 4):
-                    for x in range(0, w, 4):
-                        z = float(depth[y, x])
-                        if z > 0.01:
-                            px = (x - cx) * z / fx
-                            py = (y - cy) * z / fy
-                            all_points.append([px, py, z + i * 0.5])
-                            all_colors.append(images[i][y, x].tolist())
-
-            points_np = np.array(all_points) if all_points else np.zeros((0, 3))
-            colors_np = (np.array(all_colors) / 255.0) if all_colors else np.zeros((0, 3))
+                points_np[start:end, 0] = (xs - cx) * z / fx
+                points_np[start:end, 1] = (ys - cy) * z / fy
+                points_np[start:end, 2] = z + i * 0.5
+                colors_np[start:end] = images[i][ys, xs]
+                start = end
 
             return {
                 "backend": "open3d",
-                "num_points": len(all_points),
-                "points": points_np.tolist(),
-                "colors": colors_np.tolist(),
+                "num_points": len(points_np),
+                "points": points_np,
+                "colors": colors_np * np.float32(1 / 255.0),
             }
         except Exception as exc:
             logger.error("Open3D reconstruction failed: %s", exc)
@@ -225,28 +201,150 @@ class SceneReconstructor:
 
     def _reconstruct_opencv(self, images):
         poses = self.estimate_camera_poses(images)
-        points = []
-        colors = []
-
-        for i in range(len(images) - 1):
-            depth = self.compute_depth_pair(images[i], images[i + 1])
-            h, w = depth.shape
-            for y in range(0, h, 8):
-                for x in range(0, w, 8):
-                    z = float(depth[y, x])
-                    if z > 0.05:
-                        points.append([float(x), float(y), z * 10 + i])
-                        colors.append(images[i][y, x].tolist())
+        samples = [
+            _sample_depth(self.compute_depth_pair(images[i], images[i + 1]), step=8, min_depth=0.05)
+            for i in range(len(images) - 1)
+        ]
+        points_np, colors_np = _alloc_cloud(samples)
+
+        start = 0
+        for i, (xs, ys, z, _) in enumerate(samples):
+            end = start + len(z)
+            points_np[start:end, 0] = xs
+            points_np[start:end, 1] = ys
+            points_np[start:end, 2] = z * 10 + i
+            colors_np[start:end] = images[i][ys, xs]
+            start = end
 
         return {
             "backend": "opencv_sfm",
-            "num_points": len(points),
+            "num_points": len(points_np),
             "camera_poses": poses,
-            "points": points,
-            "colors": colors,
+            "points": points_np,
+            "colors": colors_np,
         }
 
 
+def _make_orb(cv2, use_cuda: bool = True):
+    """ORB detector and Hamming matcher: CUDA when available, else CPU/T-API.
+
+    Returns ``(orb, matcher, on_gpu)``. The CUDA matcher has no cross-check,
+    so outliers are left to the RANSAC step in findEssentialMat.
+    """
+    try:
+        if use_cuda and cv2.cuda.getCudaEnabledDeviceCount() > 0:
+            orb = cv2.cuda_ORB.create(nfeatures=2000, fastThreshold=15)
+            matcher = cv2.cuda.DescriptorMatcher_createBFMatcher(cv2.NORM_HAMMING)
+            return orb, matcher, True
+    except (AttributeError, cv2.error) as exc:
+        logger.debug("CUDA ORB unavailable, using CPU ORB: %s", exc)
+    return cv2.ORB_create(nfeatures=2000), cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True), False
+
+
+def _match_poses(cv2, images: list[np.ndarray], orb, matcher, on_gpu: bool) -> list[dict[str, Any]]:
+    """Chain ORB matches between consecutive frames into relative camera poses.
+
+    On the CUDA path a runtime ``cv2.error`` from detection or matching
+    propagates, so the caller can start over with the CPU detector.
+    """
+    poses = []
+    prev_pts, prev_des = None, None
+    for i, img in enumerate(images):
+        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        if on_gpu:
+            # Descriptors stay in device memory between frames;
+            # only keypoints come back for the CPU-only recoverPose
+            gpu_gray = cv2.cuda_GpuMat()
+            gpu_gray.upload(gray)
+            kp_gpu, des = orb.detectAndComputeAsync(gpu_gray, None)
+            kp = orb.convert(kp_gpu)
+        else:
+            # UMat lets OpenCV's T-API run ORB/BFMatcher on OpenCL when present
+            kp, des = orb.detectAndCompute(cv2.UMat(gray), None)
+        if not kp:
+            des = None
+        # (N, 2) float32 coordinates, extracted once per frame
+        pts = cv2.KeyPoint_convert(kp)
+
+        pose = {
+            "frame": i,
+            "features_detected": len(kp),
+            "rotation": np.eye(3).tolist(),
+            "translation": [0.0, 0.0, float(i)],
+        }
+
+        if prev_des is not None and des is not None:
+            matches = matcher.match(prev_des, des)
+            pose["matches_to_prev"] = len(matches)
+
+            if len(matches) >= 8:
+                query_idx = np.fromiter((m.queryIdx for m in matches), np.intp, len(matches))
+                train_idx = np.fromiter((m.trainIdx for m in matches), np.intp, len(matches))
+                src_pts = prev_pts[query_idx].reshape(-1, 1, 2)
+                dst_pts = pts[train_idx].reshape(-1, 1, 2)
+                E, mask = cv2.findEssentialMat(src_pts, dst_pts, method=cv2.RANSAC, prob=0.999, threshold=1.0)
+                if E is not None:
+                    _, R, t, _ = cv2.recoverPose(E, src_pts, dst_pts)
+                    pose["rotation"] = R.tolist()
+                    pose["translation"] = t.flatten().tolist()
+
+        prev_pts, prev_des = pts, des
+        poses.append(pose)
+
+    return poses
+
+
+def _stereo_sgm_cuda(cv2, gray_l: np.ndarray, gray_r: np.ndarray) -> Optional[np.ndarray]:
+    """Semi-global matching on the GPU (cv::cuda::StereoSGM).
+
+    Returns the 16x fixed-point disparity like ``StereoSGBM.compute``, or
+    ``None`` when OpenCV is built without CUDA so the caller uses the CPU path.
+    """
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+            return None
+        stereo = cv2.cuda.createStereoSGM(
+            minDisparity=0,
+            numDisparities=128,
+            P1=10,
+            P2=120,
+            uniquenessRatio=10,
+        )
+        gpu_l = cv2.cuda_GpuMat()
+        gpu_r = cv2.cuda_GpuMat()
+        gpu_l.upload(gray_l)
+        gpu_r.upload(gray_r)
+        return stereo.compute(gpu_l, gpu_r).download()
+    except (AttributeError, cv2.error) as exc:
+        logger.debug("CUDA StereoSGM unavailable, using CPU SGBM: %s", exc)
+        return None
+
+
+def _normalize_disparity(disp: np.ndarray) -> np.ndarray:
+    """16x fixed-point disparity (SGM/SGBM output) as float32 scaled to [0, 1]."""
+    disp = disp.astype(np.float32) / 16.0
+    return (disp - disp.min()) / (disp.max() - disp.min() + 1e-8)
+
+
+def _sample_depth(depth: np.ndarray, step: int, min_depth: float):
+    """Sample a depth map on a regular grid and keep pixels deeper than ``min_depth``.
+
+    Returns ``(xs, ys, z, (h, w))``: flat pixel indices, float32 depth and
+    the depth map shape.
+    """
+    h, w = depth.shape
+    ys, xs = np.mgrid[0:h:step, 0:w:step]
+    z = depth[ys, xs].astype(np.float32, copy=False)
+    keep = z > min_depth
+    return xs[keep], ys[keep], z[keep], (h, w)
+
+
+def _alloc_cloud(samples) -> tuple[np.ndarray, np.ndarray]:
+    """Preallocate contiguous SoA-friendly xyz (float32) and rgb (uint8) buffers."""
+    n = sum(len(z) for _, _, z, _ in samples)
+    return np.empty((n, 3), dtype=np.float32), np.empty((n, 3), dtype=np.uint8)
+
+
 def load_scene_reconstructor(device: str = "cuda") -> SceneReconstructor:
     weights = model_path("scene3d")
     return SceneReconstructor(str(weights), device)
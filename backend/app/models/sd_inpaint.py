@@ -1,14 +1,31 @@
 """
 Patch-based Inpainting на базе Stable Diffusion.
 """
+from __future__ import annotations
+
 import numpy as np
 import torch
 from PIL import Image
 import cv2
 import logging
 
+from .inference_opts import compile_for_inference
+
 logger = logging.getLogger(__name__)
 
+# Разрешения, на которых SD 1.5 inpaint работает без потери качества
+SD_NATIVE_SIZES = (512, 768)
+
+# Ниже этого объёма свободной VRAM включаем attention slicing
+LOW_VRAM_BYTES = 6 * 1024 ** 3
+
+
+def _window(lo: int, hi: int, size: int, limit: int) -> tuple[int, int]:
+    """Окно длиной size вокруг [lo, hi], сдвинутое внутрь [0, limit)."""
+    start = (lo + hi) // 2 - size // 2
+    start = max(0, min(start, limit - size))
+    return int(start), int(min(limit, start + size))
+
 
 class SDInpaint:
     def __init__(self, weights_dir: str, device: str = "cuda"):
@@ -26,14 +43,41 @@ class SDInpaint:
                 safety_checker=None
             )
             pipe = pipe.to(self.device)
-            # Оптимизация памяти для слабых видеокарт
-            pipe.enable_attention_slicing()
+            self._configure_attention(pipe)
+            # VAE по тайлам — декод больших патчей не выходит за память
+            pipe.vae.enable_tiling()
+            if self.device == "cuda":
+                pipe.vae = pipe.vae.to(memory_format=torch.channels_last)
+            pipe.unet = compile_for_inference(pipe.unet, self.device)
             logger.info("Stable Diffusion Inpaint готов к работе")
             return pipe
         except Exception as e:
             logger.warning(f"Ошибка загрузки SD Inpaint: {e}")
             return None
 
+    def _configure_attention(self, pipe):
+        """
+        Attention slicing экономит VRAM ценой скорости (в 1.5-2 раза медленнее),
+        поэтому включаем его только на слабых картах и CPU. Иначе — SDPA
+        (memory-efficient attention PyTorch 2), затем xformers.
+        """
+        if self.device == "cuda":
+            free_bytes, _ = torch.cuda.mem_get_info()
+            if free_bytes >= LOW_VRAM_BYTES:
+                try:
+                    from diffusers.models.attention_processor import AttnProcessor2_0
+                    pipe.unet.set_attn_processor(AttnProcessor2_0())
+                    return
+                except Exception as e:
+                    logger.info(f"SDPA недоступен ({e}), пробуем xformers")
+                try:
+                    pipe.enable_xformers_memory_efficient_attention()
+                    return
+                except Exception as e:
+                    logger.info(f"xformers недоступен ({e}), включаем attention slicing")
+        # Оптимизация памяти для слабых видеокарт
+        pipe.enable_attention_slicing("auto")
+
     def inpaint(self, image: np.ndarray, mask: np.ndarray,
                 prompt: str = "clean, seamless background, high quality") -> np.ndarray:
         if self.pipe is None:
@@ -44,23 +88,38 @@ class SDInpaint:
         if coords.size == 0:
             return image
 
-        # 1. Вырезаем только фрагмент (Patch) с отступом 64px для контекста
+        # 1. Окно вокруг маски (с отступом 64px для контекста) подбираем
+        #    под родное разрешение SD, а не растягиваем фрагмент до 512x512
         y_min, x_min = coords.min(axis=0)
         y_max, x_max = coords.max(axis=0)
         pad = 64
-        x1, y1 = max(0, x_min - pad), max(0, y_min - pad)
-        x2, y2 = min(w, x_max + pad), min(h, y_max + pad)
+        need = max(x_max - x_min, y_max - y_min) + 1 + 2 * pad
+        size = next((ts for ts in SD_NATIVE_SIZES if need <= ts), None)
+
+        if size is not None:
+            x1, x2 = _window(x_min, x_max, size, w)
+            y1, y2 = _window(y_min, y_max, size, h)
+        else:
+            x1, y1 = max(0, x_min - pad), max(0, y_min - pad)
+            x2, y2 = min(w, x_max + pad), min(h, y_max + pad)
 
         patch = image[y1:y2, x1:x2]
         patch_mask = mask[y1:y2, x1:x2]
         ph, pw = patch.shape[:2]
 
-        # 2. SD требует размер 512x512
-        patch_resized = cv2.resize(patch, (512, 512))
-        mask_resized = cv2.resize(patch_mask, (512, 512))
+        # 2. Быстрый путь: без resize, только добивка краёв, если кадр меньше окна.
+        #    Маска больше окна — сжимаем фрагмент до максимального размера SD.
+        native = size is not None
+        if native:
+            patch_in = cv2.copyMakeBorder(patch, 0, size - ph, 0, size - pw, cv2.BORDER_REFLECT_101)
+            mask_in = cv2.copyMakeBorder(patch_mask, 0, size - ph, 0, size - pw, cv2.BORDER_CONSTANT, value=0)
+        else:
+            size = SD_NATIVE_SIZES[-1]
+            patch_in = cv2.resize(patch, (size, size))
+            mask_in = cv2.resize(patch_mask, (size, size))
 
-        patch_pil = Image.fromarray(patch_resized)
-        mask_pil = Image.fromarray(mask_resized).convert("L")
+        patch_pil = Image.fromarray(patch_in)
+        mask_pil = Image.fromarray(mask_in).convert("L")
 
         # 3. Инференс нейросети
         with torch.inference_mode():
@@ -68,15 +127,22 @@ class SDInpaint:
                 prompt=prompt,
                 image=patch_pil,
                 mask_image=mask_pil,
+                height=size,
+                width=size,
                 num_inference_steps=25
             ).images[0]
 
         # 4. Возвращаем оригинальный размер и вклеиваем обратно
-        result_patch = cv2.resize(np.array(result_pil), (pw, ph))
-
+        result_np = np.array(result_pil)
+        if native:
+            result_patch = result_np[:ph, :pw]
+        else:
+            result_patch = cv2.resize(result_np, (pw, ph))
+
+        # Маска бинарная: маскированная копия uint8 прямо в окно результата,
+        # без float-временных массивов
         final_image = image.copy()
-        alpha = (patch_mask > 0).astype(np.float32)[..., np.newaxis]
-        final_image[y1:y2, x1:x2] = (result_patch * alpha + patch * (1 - alpha)).astype(np.uint8)
+        np.copyto(final_image[y1:y2, x1:x2], result_patch, where=(patch_mask > 0)[..., np.newaxis])
 
         return final_image
 
@@ -10,17 +10,36 @@ Fallback: GrabCut (OpenCV) when SAM weights are absent.
 
 from __future__ import annotations
 
+import hashlib
 import logging
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional
 
 import numpy as np
 import torch
 
+from .inference_opts import compile_for_inference
 from .model_paths import model_path
 
 logger = logging.getLogger(__name__)
 
+EMBEDDING_CACHE_SIZE = 4
+# Auto mode pads its point grid to exactly this many prompts, so the compiled
+# decoder always sees one shape
+AUTO_NUM_POINTS = 32
+
+
+def _image_key(image: np.ndarray) -> tuple:
+    """Content hash of the pixels plus the layout.
+
+    Buffer addresses are reused by numpy and a sparse sample misses small
+    edits, so the whole image is hashed: a few ms against the encoder run.
+    """
+    digest = hashlib.blake2b(np.ascontiguousarray(image).data, digest_size=16).digest()
+    return digest, image.shape, image.dtype.str
+
 
 class SegmentAnything:
     """Wrapper for SAM 2 segmentation."""
@@ -29,6 +48,10 @@ class SegmentAnything:
         self.device = device
         self.model = None
         self.processor = None
+        # image key -> (image_embeddings, original_sizes, reshaped_input_sizes)
+        self._emb_cache: OrderedDict[tuple, tuple] = OrderedDict()
+        # Compiled mask decoder, used only for auto-mode batches of AUTO_NUM_POINTS
+        self._auto_decoder = None
         self._load(weights_path)
 
     def _load(self, weights_path: str):
@@ -40,6 +63,43 @@ class SegmentAnything:
             logger.info("SAM-2 loaded (transformers)")
         except Exception as exc:
             logger.warning("SAM-2 unavailable (%s), using GrabCut fallback", exc)
+            return
+        self._compile_decoder()
+
+    def _compile_decoder(self):
+        """Compile the lightweight mask decoder for the fixed auto-mode prompt shape.
+
+        Point and box clicks keep the eager decoder: their prompt counts vary and
+        each new shape would recompile a ``dynamic=False`` graph at request time.
+        A one-shot warm-up triggers compilation and CUDA graph capture up front;
+        if it fails auto mode stays eager too.
+        """
+        if self.device != "cuda":
+            return
+        eager = self.model.mask_decoder
+        compiled = compile_for_inference(eager, self.device, fullgraph=True, dynamic=False)
+        if compiled is eager:
+            return
+        self._auto_decoder = compiled
+        try:
+            dummy = np.zeros((1024, 1024, 3), dtype=np.uint8)
+            self._segment_auto_sam(dummy, AUTO_NUM_POINTS, raise_errors=True)
+        except Exception as exc:
+            logger.warning("SAM decoder compilation failed, using eager decoder: %s", exc)
+            self._auto_decoder = None
+        finally:
+            self.invalidate()
+
+    @contextmanager
+    def _decoder(self, compiled: bool):
+        """Run the model with the compiled mask decoder swapped in, if requested and available."""
+        eager = self.model.mask_decoder
+        if compiled and self._auto_decoder is not None:
+            self.model.mask_decoder = self._auto_decoder
+        try:
+            yield
+        finally:
+            self.model.mask_decoder = eager
 
     def segment_point(
         self,
@@ -72,7 +132,7 @@ class SegmentAnything:
         cx, cy = (box[0] + box[2]) // 2, (box[1] + box[3]) // 2
         return self._segment_grabcut(image, [(cx, cy)])
 
-    def segment_auto(self, image: np.ndarray, num_points: int = 32) -> list[np.ndarray]:
+    def segment_auto(self, image: np.ndarray, num_points: int = AUTO_NUM_POINTS) -> list[np.ndarray]:
         """
         Automatic segmentation — generate masks for all objects.
 
@@ -90,69 +150,151 @@ class SegmentAnything:
         except ImportError:
             return [np.ones(image.shape[:2], dtype=bool)]
 
+    def invalidate(self, image: Optional[np.ndarray] = None) -> None:
+        """Drop the cached embedding for ``image`` (or all of them)."""
+        if image is None:
+            self._emb_cache.clear()
+        else:
+            self._emb_cache.pop(_image_key(image), None)
+
     # ------------------------------------------------------------------
-    def _segment_sam(self, image, points, labels):
-        from PIL import Image as PILImage
+    def _get_image_embedding(self, image):
+        """Run the ViT image encoder once per image; point/box clicks reuse it."""
+        key = _image_key(image)
+        entry = self._emb_cache.get(key)
+        if entry is not None:
+            self._emb_cache.move_to_end(key)
+            return entry
+
+        pixel_values, original_sizes, reshaped_sizes = self._pixel_values(image)
+        with torch.no_grad():
+            embeddings = self.model.get_image_embeddings(pixel_values)
 
-        pil_img = PILImage.fromarray(image)
-        input_points = [points]
-        input_labels = [labels]
+        entry = (embeddings, original_sizes, reshaped_sizes)
+        self._emb_cache[key] = entry
+        if len(self._emb_cache) > EMBEDDING_CACHE_SIZE:
+            self._emb_cache.popitem(last=False)
+        return entry
 
-        inputs = self.processor(
-            pil_img,
-            input_points=input_points,
-            input_labels=input_labels,
-            return_tensors="pt",
-        ).to(self.device)
+    def _pixel_values(self, image):
+        """SamProcessor preprocessing done on the device, without the PIL round-trip.
 
-        with torch.no_grad():
-            outputs = self.model(**inputs)
+        Upload uint8, resize the longest edge to the encoder size, normalize
+        with the processor's mean/std and zero-pad bottom/right to a square.
+        """
+        import torch.nn.functional as F
 
-        masks = self.processor.image_processor.post_process_masks(
-            outputs.pred_masks.cpu(),
-            inputs["original_sizes"].cpu(),
-            inputs["reshaped_input_sizes"].cpu(),
+        image_processor = self.processor.image_processor
+        target = image_processor.size["longest_edge"]
+        h, w = image.shape[:2]
+        scale = target / max(h, w)
+        new_h, new_w = int(h * scale + 0.5), int(w * scale + 0.5)
+
+        tensor = torch.from_numpy(np.ascontiguousarray(image)).to(self.device, non_blocking=True)
+        tensor = tensor.permute(2, 0, 1).unsqueeze(0).float()
+        tensor = F.interpolate(tensor, size=(new_h, new_w), mode="bilinear", align_corners=False, antialias=True)
+
+        mean = torch.tensor(image_processor.image_mean, device=self.device).view(1, 3, 1, 1) * 255.0
+        std = torch.tensor(image_processor.image_std, device=self.device).view(1, 3, 1, 1) * 255.0
+        tensor = (tensor - mean) / std
+        tensor = F.pad(tensor, (0, target - new_w, 0, target - new_h))
+
+        original_sizes = torch.tensor([[h, w]], device=self.device)
+        reshaped_sizes = torch.tensor([[new_h, new_w]], device=self.device)
+        return tensor, original_sizes, reshaped_sizes
+
+    def _scale_prompt(self, coords, original_sizes, reshaped_sizes) -> torch.Tensor:
+        """Map (x, y) prompt coordinates to the encoder's resized frame, like SamProcessor does."""
+        coords = torch.as_tensor(coords, dtype=torch.float32, device=self.device)
+        old_h, old_w = original_sizes[0].tolist()
+        new_h, new_w = reshaped_sizes[0].tolist()
+        scale = torch.tensor([new_w / old_w, new_h / old_h], device=self.device)
+        return (coords.reshape(*coords.shape[:-1], -1, 2) * scale).reshape(coords.shape)
+
+    def _decode_masks(self, outputs, original_sizes, reshaped_sizes):
+        """Upscale and binarize masks on the model device; only bool masks cross to the host."""
+        return self.processor.image_processor.post_process_masks(
+            outputs.pred_masks,
+            original_sizes,
+            reshaped_sizes,
+            binarize=True,
         )
-        return masks[0][0][0].numpy().astype(bool)
 
-    def _segment_sam_box(self, image, box):
-        from PIL import Image as PILImage
+    def _segment_sam(self, image, points, labels):
+        embeddings, original_sizes, reshaped_sizes = self._get_image_embedding(image)
+        # (batch=1, point_batch=1, P, 2): all clicks describe one object
+        input_points = self._scale_prompt([[points]], original_sizes, reshaped_sizes)
+        input_labels = torch.as_tensor([[labels]], dtype=torch.long, device=self.device)
+
+        with torch.no_grad():
+            outputs = self.model(
+                image_embeddings=embeddings,
+                input_points=input_points,
+                input_labels=input_labels,
+                multimask_output=False,
+            )
+
+        masks = self._decode_masks(outputs, original_sizes, reshaped_sizes)
+        return masks[0][0, 0].cpu().numpy()
 
-        pil_img = PILImage.fromarray(image)
-        inputs = self.processor(
-            pil_img,
-            input_boxes=[[[box[0], box[1], box[2], box[3]]]],
-            return_tensors="pt",
-        ).to(self.device)
+    def _segment_sam_box(self, image, box):
+        embeddings, original_sizes, reshaped_sizes = self._get_image_embedding(image)
+        input_boxes = self._scale_prompt([[list(box)]], original_sizes, reshaped_sizes)
 
         with torch.no_grad():
-            outputs = self.model(**inputs)
+            outputs = self.model(
+                image_embeddings=embeddings,
+                input_boxes=input_boxes,
+                multimask_output=False,
+            )
 
-        masks = self.processor.image_processor.post_process_masks(
-            outputs.pred_masks.cpu(),
-            inputs["original_sizes"].cpu(),
-            inputs["reshaped_input_sizes"].cpu(),
-        )
-        return masks[0][0][0].numpy().astype(bool)
+        masks = self._decode_masks(outputs, original_sizes, reshaped_sizes)
+        return masks[0][0, 0].cpu().numpy()
 
-    def _segment_auto_sam(self, image, num_points):
+    def _segment_auto_sam(self, image, num_points, raise_errors=False):
         h, w = image.shape[:2]
-        step_h = h // int(num_points ** 0.5)
-        step_w = w // int(num_points ** 0.5)
+        side = int(num_points ** 0.5)
+        step_h = max(1, h // side)
+        step_w = max(1, w // side)
         points = []
         for y in range(step_h // 2, h, step_h):
             for x in range(step_w // 2, w, step_w):
                 points.append((x, y))
 
-        masks = []
-        for pt in points[:num_points]:
-            try:
-                m = self.segment_point(image, [pt])
-                if m.any():
-                    masks.append(m)
-            except Exception:
-                continue
-        return masks
+        points = points[:num_points]
+        if not points:
+            return []
+        # The grid is usually smaller than num_points (5x5 for 32): pad it with
+        # copies of the last point so the prompt batch has a fixed size, and
+        # drop the masks of the padding below
+        grid_size = len(points)
+        points += [points[-1]] * (num_points - grid_size)
+
+        # Every point is a separate prompt in one batch: the image encoder
+        # runs once and the mask decoder runs once over all N prompts.
+        try:
+            embeddings, original_sizes, reshaped_sizes = self._get_image_embedding(image)
+            input_points = self._scale_prompt([[[pt] for pt in points]], original_sizes, reshaped_sizes)
+            input_labels = torch.ones((1, len(points), 1), dtype=torch.long, device=self.device)
+
+            with torch.no_grad(), self._decoder(compiled=num_points == AUTO_NUM_POINTS):
+                outputs = self.model(
+                    image_embeddings=embeddings,
+                    input_points=input_points,
+                    input_labels=input_labels,
+                    multimask_output=True,
+                )
+
+            masks = self._decode_masks(outputs, original_sizes, reshaped_sizes)
+        except Exception as exc:
+            if raise_errors:
+                raise
+            logger.warning("SAM auto segmentation failed: %s", exc)
+            return []
+
+        # (N, 3, H, W) -> first candidate per prompt
+        per_point = masks[0][:grid_size, 0].cpu().numpy()
+        return [m for m in per_point if m.any()]
 
     @staticmethod
     def _segment_grabcut(image, points):
@@ -176,7 +318,7 @@ class SegmentAnything:
             else:
                 rect = (10, 10, w - 20, h - 20)
 
-            bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            bgr = np.ascontiguousarray(image[:, :, ::-1])
             cv2.grabCut(bgr, mask, rect, bgd, fgd, 5, cv2.GC_INIT_WITH_RECT)
             return ((mask == cv2.GC_FGD) | (mask == cv2.GC_PR_FGD)).astype(bool)
         except Exception as exc:
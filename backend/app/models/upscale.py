@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import copy
 import io
 import logging
 from pathlib import Path
@@ -14,15 +15,144 @@ from .download_models import download_realesrgan_x4
 
 logger = logging.getLogger(__name__)
 
-_realesrgan_path: Path | None = None
+# (path, size): the size decides real weights vs placeholder and is stat()ed once
+_realesrgan_info: tuple[Path, int] | None = None
 _upscaler_cache: dict[int, object] = {}
 
+# RealESRGANer feeds tiles of tile + 2 * tile_pad pixels; edge tiles can be as
+# small as (W mod tile) + tile_pad, so the profile spans 1..TRT_MAX_SIDE
+TRT_TILE = 512
+TRT_TILE_PAD = 10
+TRT_MAX_SIDE = TRT_TILE + 2 * TRT_TILE_PAD
+# Batched forwards from the queue (tasks.BATCH_SIZE) run through the engine too
+TRT_MAX_BATCH = 4
+TRT_WORKSPACE_BYTES = 4 << 30
+
+
+class _TrtModule:
+    """Drop-in for ``RealESRGANer.model`` backed by a serialized TensorRT engine.
+
+    Engine I/O stays fp32 (FP16 is used inside the engine), so the wrapper
+    casts the half-precision tiles RealESRGANer produces and casts back.
+    Shapes outside the optimization profile run on the PyTorch ``fallback``:
+    RealESRGANer's tile_process swallows exceptions and would otherwise
+    silently reuse the previous tile.
+    """
+
+    def __init__(self, engine, fallback):
+        self.engine = engine
+        self.fallback = fallback
+        self.context = engine.create_execution_context()
+        self.input_name = "x"
+        self.output_name = "y"
+
+    def _in_profile(self, shape: tuple[int, ...]) -> bool:
+        n, _, h, w = shape
+        return 1 <= n <= TRT_MAX_BATCH and 1 <= h <= TRT_MAX_SIDE and 1 <= w <= TRT_MAX_SIDE
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        if x.dim() != 4 or not self._in_profile(tuple(x.shape)):
+            return self.fallback(x)
+        inp = x.float().contiguous()
+        if not self.context.set_input_shape(self.input_name, tuple(inp.shape)):
+            return self.fallback(x)
+        out = torch.empty(tuple(self.context.get_tensor_shape(self.output_name)), dtype=torch.float32, device=inp.device)
+        self.context.set_tensor_address(self.input_name, inp.data_ptr())
+        self.context.set_tensor_address(self.output_name, out.data_ptr())
+        if not self.context.execute_async_v3(torch.cuda.current_stream().cuda_stream):
+            raise RuntimeError("TensorRT execution failed")
+        return out.to(x.dtype)
+
+
+def _build_trt_engine(model, plan_path: Path) -> bytes:
+    """ONNX export of RRDBNet and an FP16 engine build for up to TRT_MAX_BATCH tiles of 1..TRT_MAX_SIDE."""
+    import tensorrt as trt
+
+    onnx_path = plan_path.with_suffix(".onnx")
+    dummy = torch.zeros((1, 3, TRT_TILE, TRT_TILE), device="cuda")
+    torch.onnx.export(
+        # copy: .float() is in-place and the fp16 network stays as the fallback
+        copy.deepcopy(model).float().eval(),
+        dummy,
+        str(onnx_path),
+        opset_version=17,
+        input_names=["x"],
+        output_names=["y"],
+        dynamic_axes={"x": {0: "N", 2: "H", 3: "W"}, "y": {0: "N", 2: "H4", 3: "W4"}},
+    )
+
+    trt_logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(trt_logger)
+    network = builder.create_network(0)
+    parser = trt.OnnxParser(network, trt_logger)
+    if not parser.parse(onnx_path.read_bytes()):
+        raise RuntimeError(f"ONNX parse failed: {parser.get_error(0)}")
+
+    config = builder.create_builder_config()
+    config.set_flag(trt.BuilderFlag.FP16)
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, TRT_WORKSPACE_BYTES)
+    profile = builder.create_optimization_profile()
+    profile.set_shape(
+        "x", (1, 3, 1, 1), (1, 3, TRT_MAX_SIDE, TRT_MAX_SIDE), (TRT_MAX_BATCH, 3, TRT_MAX_SIDE, TRT_MAX_SIDE)
+    )
+    config.add_optimization_profile(profile)
+
+    serialized = builder.build_serialized_network(network, config)
+    if serialized is None:
+        raise RuntimeError("TensorRT engine build failed")
+    plan = bytes(serialized)
+    plan_path.write_bytes(plan)
+    onnx_path.unlink(missing_ok=True)
+    return plan
 
-def _ensure_realesrgan_weights() -> Path:
-    global _realesrgan_path
-    if _realesrgan_path is None:
-        _realesrgan_path = download_realesrgan_x4()
-    return _realesrgan_path
+
+def _trt_plan_path(weights_path: Path) -> Path:
+    return weights_path.parent / f"realesrgan_x4_fp16_tile{TRT_TILE}_n{TRT_MAX_BATCH}.plan"
+
+
+def _load_trt_module(model, weights_path: Path):
+    """Engine cached next to the weights, or None (no TensorRT / not built yet).
+
+    The build takes minutes, so it never runs on a request inside the task time
+    limit: run ``python -m app.models.upscale`` once per GPU host instead.
+    """
+    if not torch.cuda.is_available():
+        return None
+    plan_path = _trt_plan_path(weights_path)
+    if not plan_path.exists():
+        logger.info("No TensorRT plan at %s, using PyTorch for Real-ESRGAN", plan_path)
+        return None
+    try:
+        import tensorrt as trt
+
+        engine = trt.Runtime(trt.Logger(trt.Logger.WARNING)).deserialize_cuda_engine(plan_path.read_bytes())
+        if engine is None:
+            raise RuntimeError(f"cannot deserialize {plan_path}")
+        return _TrtModule(engine, model)
+    except Exception as exc:
+        logger.info("TensorRT unavailable for Real-ESRGAN, using PyTorch: %s", exc)
+        return None
+
+
+def build_trt_engine() -> Path:
+    """Offline step: export the loaded network and build the engine plan next to the weights."""
+    weights_path, weights_size = _ensure_realesrgan_weights()
+    if weights_size < 1_000_000:
+        raise RuntimeError("Real-ESRGAN weights are not available")
+    model = _get_upscaler(4).model
+    if isinstance(model, _TrtModule):
+        model = model.fallback
+    plan_path = _trt_plan_path(weights_path)
+    _build_trt_engine(model, plan_path)
+    return plan_path
+
+
+def _ensure_realesrgan_weights() -> tuple[Path, int]:
+    global _realesrgan_info
+    if _realesrgan_info is None:
+        path = download_realesrgan_x4()
+        _realesrgan_info = (path, path.stat().st_size)
+    return _realesrgan_info
 
 
 def _get_upscaler(factor: int):
@@ -40,25 +170,51 @@ def _get_upscaler(factor: int):
         num_grow_ch=32,
         scale=4,
     )
-    weights_path = str(_ensure_realesrgan_weights())
+    if torch.cuda.is_available():
+        # NHWC: fp16 convolutions on tensor cores without layout transposes
+        model = model.to(memory_format=torch.channels_last)
+    weights_path = str(_ensure_realesrgan_weights()[0])
 
     upscaler = RealESRGANer(
         scale=4,
         model_path=weights_path,
         model=model,
-        tile=512,
-        tile_pad=10,
+        tile=TRT_TILE,
+        tile_pad=TRT_TILE_PAD,
         pre_pad=0,
         half=torch.cuda.is_available(),
         device="cuda" if torch.cuda.is_available() else "cpu",
     )
+    # Weights are loaded by now: the engine is exported from the trained network
+    trt_module = _load_trt_module(upscaler.model, Path(weights_path))
+    if trt_module is not None:
+        upscaler.model = trt_module
     _upscaler_cache[factor] = upscaler
     return upscaler
 
 
-async def upscale_image(image: bytes, factor: int = 2) -> bytes:
-    weights = _ensure_realesrgan_weights()
-    if weights.stat().st_size < 1_000_000:
+def _upscale_batch(tensor: torch.Tensor, factor: int = 2) -> torch.Tensor:
+    """model_fn for :func:`app.queue.batch.process_batch`.
+
+    Images no larger than one tile go through the network in a single
+    batched forward, bypassing RealESRGANer's per-image tiling. With a
+    TensorRT plan, batches of up to TRT_MAX_BATCH run on the engine; anything
+    else falls back to PyTorch inside :class:`_TrtModule`. The x4 output is
+    resampled to ``factor`` like ``enhance(outscale=factor)``.
+    """
+    if _ensure_realesrgan_weights()[1] < 1_000_000:
+        raise RuntimeError("Real-ESRGAN weights are not available")
+    out = _get_upscaler(factor).model(tensor)
+    if factor != 4:
+        out = torch.nn.functional.interpolate(
+            out, scale_factor=factor / 4, mode="bicubic", align_corners=False, antialias=True
+        )
+    return out
+
+
+def upscale_image_sync(image: bytes, factor: int = 2) -> bytes:
+    _, weights_size = _ensure_realesrgan_weights()
+    if weights_size < 1_000_000:
         return image
 
     try:
@@ -73,3 +229,12 @@ async def upscale_image(image: bytes, factor: int = 2) -> bytes:
     except Exception as exc:  # pragma: no cover - depends on optional heavy deps
         logger.warning("Real-ESRGAN unavailable, fallback to original image: %s", exc)
         return image
+
+
+async def upscale_image(image: bytes, factor: int = 2) -> bytes:
+    return upscale_image_sync(image, factor)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info("TensorRT engine ready: %s", build_trt_engine())
@@ -2,14 +2,23 @@
 
 from __future__ import annotations
 
-import io
+import asyncio
 import logging
+import re
 import tempfile
 from pathlib import Path
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Literal, Optional, Union
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+FrameEncoding = Literal["png", "jpeg", "raw"]
+PNG_COMPRESSION = 1
+JPEG_QUALITY = 92
+# Side of the grayscale thumbnails scene detection compares
+THUMB_SIZE = 64
+
 try:
     import ffmpeg  # type: ignore
 
@@ -19,37 +28,94 @@ except ImportError:
     logger.warning("ffmpeg-python not installed — video pipeline disabled")
 
 
-async def extract_frames(video_bytes: bytes, fps: float = 1.0) -> list[bytes]:
-    if not FFMPEG_AVAILABLE:
-        return []
+# "Output #0 ... Stream #0:0: Video: rawvideo (RGB[24] / 0x18424752), rgb24, 1280x720, ..."
+_OUTPUT_VIDEO_RE = re.compile(r"Video: rawvideo\b[^\n]*?, (\d+)x(\d+)")
+
+
+def _output_geometry(stderr: bytes) -> Optional[tuple[int, int]]:
+    """Frame size of the rawvideo output from ffmpeg's own stream report; saves an ffprobe spawn."""
+    text = stderr.decode("utf-8", "replace")
+    output = text.rfind("Output #0")
+    match = _OUTPUT_VIDEO_RE.search(text, output if output >= 0 else 0)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _probe_geometry(path: str) -> Optional[tuple[int, int]]:
+    probe = ffmpeg.probe(path)
+    video_stream = next((s for s in probe["streams"] if s.get("codec_type") == "video"), None)
+    if video_stream is None:
+        return None
+    return int(video_stream["width"]), int(video_stream["height"])
+
+
+def _empty_frames() -> np.ndarray:
+    return np.empty((0, 0, 0, 3), dtype=np.uint8)
+
+
+def _empty_thumbs() -> np.ndarray:
+    return np.empty((0, THUMB_SIZE, THUMB_SIZE), dtype=np.uint8)
+
+
+def _decode_rawvideo(
+    source: str,
+    fps: float,
+    input_bytes: Optional[bytes] = None,
+    thumbs_path: Optional[str] = None,
+) -> tuple[bytes, bytes]:
+    """Run ffmpeg once: sampled frames as rgb24 on stdout, the stream report on stderr.
+
+    With ``thumbs_path`` the sampled stream is split and a second output
+    writes THUMB_SIZE² grayscale thumbnails there, scaled by libswscale
+    from the same decode.
+    """
+    sampled = ffmpeg.input(source).filter("fps", fps=fps)
+    if thumbs_path is None:
+        cmd = sampled.output("pipe:", format="rawvideo", pix_fmt="rgb24")
+    else:
+        split = sampled.split()
+        cmd = ffmpeg.merge_outputs(
+            split[0].output("pipe:", format="rawvideo", pix_fmt="rgb24"),
+            split[1].filter("scale", THUMB_SIZE, THUMB_SIZE).output(thumbs_path, format="rawvideo", pix_fmt="gray"),
+        )
+    return cmd.run(input=input_bytes, capture_stdout=True, capture_stderr=True, quiet=True, overwrite_output=True)
+
+
+def _frames_from_buffer(out: bytes, geometry: tuple[int, int]) -> np.ndarray:
+    width, height = geometry
+    frame_size = width * height * 3
+    # A trailing partial frame is dropped
+    count = len(out) // frame_size
+    return np.frombuffer(out, dtype=np.uint8, count=count * frame_size).reshape(count, height, width, 3)
+
+
+def _read_thumbs(path: str, count: int) -> np.ndarray:
+    thumbs = np.fromfile(path, dtype=np.uint8)
+    n = min(count, thumbs.size // (THUMB_SIZE * THUMB_SIZE))
+    return thumbs[: n * THUMB_SIZE * THUMB_SIZE].reshape(n, THUMB_SIZE, THUMB_SIZE)
+
+
+def _extract(video_bytes: bytes, fps: float, thumbs_path: Optional[str]) -> np.ndarray:
+    # Fast path: video bytes go straight to ffmpeg's stdin, no disk write.
+    # MP4s with the moov atom at the end need a seekable input; those fail
+    # here and fall through to a temp file.
+    try:
+        out, err = _decode_rawvideo("pipe:", fps, video_bytes, thumbs_path)
+        geometry = _output_geometry(err)
+        if geometry and out:
+            return _frames_from_buffer(out, geometry)
+    except Exception as exc:
+        logger.debug("Piped frame extraction failed, retrying from a file: %s", exc)
 
     with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
         tmp.write(video_bytes)
         tmp_path = tmp.name
 
-    frames: list[bytes] = []
+    frames = _empty_frames()
     try:
-        out, _ = (
-            ffmpeg.input(tmp_path)
-            .filter("fps", fps=fps)
-            .output("pipe:", format="rawvideo", pix_fmt="rgb24")
-            .run(capture_stdout=True, capture_stderr=True, quiet=True)
-        )
-        probe = ffmpeg.probe(tmp_path)
-        video_stream = next((s for s in probe["streams"] if s.get("codec_type") == "video"), None)
-        if video_stream:
-            width = int(video_stream["width"])
-            height = int(video_stream["height"])
-            frame_size = width * height * 3
-            for i in range(0, len(out), frame_size):
-                raw = out[i : i + frame_size]
-                if len(raw) == frame_size:
-                    from PIL import Image
-
-                    img = Image.frombytes("RGB", (width, height), raw)
-                    buf = io.BytesIO()
-                    img.save(buf, format="PNG")
-                    frames.append(buf.getvalue())
+        out, err = _decode_rawvideo(tmp_path, fps, thumbs_path=thumbs_path)
+        geometry = _output_geometry(err) or _probe_geometry(tmp_path)
+        if geometry:
+            frames = _frames_from_buffer(out, geometry)
     except Exception as exc:
         logger.error("Frame extraction failed: %s", exc)
     finally:
@@ -58,29 +124,112 @@ async def extract_frames(video_bytes: bytes, fps: float = 1.0) -> list[bytes]:
     return frames
 
 
+async def extract_frames(
+    video_bytes: bytes,
+    fps: float = 1.0,
+    with_thumbnails: bool = False,
+) -> Union[np.ndarray, tuple[np.ndarray, np.ndarray]]:
+    """Decode sampled frames as one (N, H, W, 3) uint8 RGB array.
+
+    The array is a view over ffmpeg's rawvideo output: frames are not
+    re-encoded here. Use :func:`encode_frame` where bytes are needed.
+
+    With ``with_thumbnails`` returns ``(frames, thumbs)``, where ``thumbs``
+    is the (N, THUMB_SIZE, THUMB_SIZE) grayscale array that
+    :func:`detect_scene_changes` consumes directly.
+    """
+    if not FFMPEG_AVAILABLE:
+        return (_empty_frames(), _empty_thumbs()) if with_thumbnails else _empty_frames()
+    if not with_thumbnails:
+        return _extract(video_bytes, fps, None)
+
+    with tempfile.NamedTemporaryFile(suffix=".gray", delete=False) as tmp:
+        thumbs_path = tmp.name
+    try:
+        frames = _extract(video_bytes, fps, thumbs_path)
+        thumbs = _read_thumbs(thumbs_path, len(frames)) if len(frames) else _empty_thumbs()
+    finally:
+        Path(thumbs_path).unlink(missing_ok=True)
+    return frames, thumbs
+
+
+def decode_rgb(buf: bytes, grayscale: bool = False) -> np.ndarray:
+    """Decode encoded image bytes to (H, W, 3) RGB, or (H, W) gray, with OpenCV's SIMD codecs.
+
+    EXIF orientation is ignored, matching ``PIL.Image.open(...).convert(...)``.
+    """
+    import cv2
+
+    flags = (cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR) | cv2.IMREAD_IGNORE_ORIENTATION
+    img = cv2.imdecode(np.frombuffer(buf, np.uint8), flags)
+    if img is None:
+        raise ValueError("cannot decode image")
+    return img if grayscale else cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def encode_frame(frame: np.ndarray, encoding: FrameEncoding = "png") -> bytes:
+    """Encode an RGB frame.
+
+    ``png`` (zlib level 1, lossless) is for results returned to the client.
+    ``jpeg`` (libjpeg-turbo SIMD, quality 92) is several times faster and far
+    smaller, for intermediate frames handed straight to another model.
+    ``raw`` is the bare RGB24 bytes.
+    """
+    if encoding == "raw":
+        return frame.tobytes()
+
+    import cv2
+
+    bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+    if encoding == "jpeg":
+        ok, buf = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    else:
+        ok, buf = cv2.imencode(".png", bgr, [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION])
+    if not ok:
+        raise ValueError(f"{encoding} encoding failed")
+    return buf.tobytes()
+
+
 async def process_video_frames(
     video_bytes: bytes,
     operation: str,
     params: dict,
-    frame_processor: Callable[[bytes, dict], Any],
+    frame_processor: Callable[[np.ndarray, dict], Any],
     fps: float = 1.0,
     on_progress: Optional[Callable[[int, int], None]] = None,
+    concurrency: int = 2,
 ) -> dict[str, Any]:
+    """Run the synchronous ``frame_processor`` over every extracted frame.
+
+    The processor runs in worker threads, at most ``concurrency`` at a time.
+    CUDA kernels and the codec calls release the GIL, so one frame's model
+    compute overlaps another's encode. Keep ``concurrency`` small: every
+    in-flight frame holds its own activations in VRAM.
+    """
     frames = await extract_frames(video_bytes, fps=fps)
     total = len(frames)
     if total == 0:
         return {"frames_processed": 0, "frames_total": 0, "results": [], "operation": operation}
 
-    results = []
-    for i, frame in enumerate(frames):
-        try:
-            result = await frame_processor(frame, params)
-            results.append({"frame": i, "status": "ok", "data": result})
-        except Exception as exc:
-            logger.error("Frame %d processing failed: %s", i, exc)
-            results.append({"frame": i, "status": "error", "error": str(exc)})
+    sem = asyncio.Semaphore(max(1, concurrency))
+    done = 0
+
+    async def _one(i: int, frame: np.ndarray) -> dict[str, Any]:
+        nonlocal done
+        async with sem:
+            try:
+                data = await asyncio.to_thread(frame_processor, frame, params)
+                outcome = {"frame": i, "status": "ok", "data": data}
+            except Exception as exc:
+                logger.error("Frame %d processing failed: %s", i, exc)
+                outcome = {"frame": i, "status": "error", "error": str(exc)}
+        done += 1
         if on_progress:
-            on_progress(i + 1, total)
+            on_progress(done, total)
+        return outcome
+
+    # gather keeps the input order, so results stay indexed by frame
+    results = await asyncio.gather(*(_one(i, frame) for i, frame in enumerate(frames)))
 
     return {
         "frames_processed": len([r for r in results if r["status"] == "ok"]),
@@ -90,18 +239,27 @@ async def process_video_frames(
     }
 
 
-async def detect_scene_changes(frames: list[bytes], threshold: float = 28.0) -> list[int]:
-    import numpy as np
-    from PIL import Image
-
-    scene_cuts: list[int] = []
-    prev_array = None
-    for i, frame_bytes in enumerate(frames):
-        img = Image.open(io.BytesIO(frame_bytes)).convert("L").resize((64, 64))
-        curr_array = np.array(img, dtype=np.float32)
-        if prev_array is not None:
-            mad = float(np.mean(np.abs(curr_array - prev_array)))
-            if mad > threshold:
-                scene_cuts.append(i)
-        prev_array = curr_array
-    return scene_cuts
+async def detect_scene_changes(frames: Union[np.ndarray, list[bytes]], threshold: float = 28.0) -> list[int]:
+    """Indices of frames whose mean absolute difference to the previous frame exceeds ``threshold``.
+
+    Accepts the (N, THUMB_SIZE, THUMB_SIZE) grayscale thumbnails from
+    ``extract_frames(..., with_thumbnails=True)`` (no image work at all),
+    the raw (N, H, W, 3) frames, or a list of encoded images.
+    """
+    if len(frames) < 2:
+        return []
+
+    if isinstance(frames, np.ndarray) and frames.ndim == 3:
+        thumbs = frames
+    else:
+        import cv2
+
+        if isinstance(frames, np.ndarray):
+            gray = (cv2.cvtColor(f, cv2.COLOR_RGB2GRAY) for f in frames)
+        else:
+            gray = (decode_rgb(b, grayscale=True) for b in frames)
+        thumbs = np.stack([cv2.resize(g, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA) for g in gray])
+    # int16 so frame differences do not wrap around
+    mad = np.abs(np.diff(thumbs.astype(np.int16), axis=0)).mean(axis=(1, 2))
+    # diff k compares frames k and k+1, the cut is at frame k+1
+    return (np.nonzero(mad > threshold)[0] + 1).tolist()
@@ -4,35 +4,77 @@ from __future__ import annotations
 
 import io
 import logging
-from typing import Callable, Optional
+from typing import Awaitable, Callable, Optional
 
 import numpy as np
 from PIL import Image
 
+from app.models.video_pipeline import FrameEncoding, decode_rgb, encode_frame
+
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
-def images_to_batch_tensor(images: list[bytes], target_size: tuple[int, int] = (512, 512)):
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, boundscheck=False, cache=True)
+    def _hwc_to_chw_unit(rgb, out):
+        """out[c, y, x] = rgb[y, x, c] / 255 in one pass: rescale and transpose fused."""
+        scale = np.float32(1.0 / 255.0)
+        h, w, channels = rgb.shape
+        for y in prange(h):
+            for x in range(w):
+                for c in range(channels):
+                    out[c, y, x] = np.float32(rgb[y, x, c]) * scale
+
+
+def images_to_batch_tensor(
+    images: list[bytes],
+    target_size: tuple[int, int] = (512, 512),
+    pin_memory: bool = False,
+):
+    """Decode images into one (B, 3, H, W) float32 tensor in [0, 1].
+
+    The batch is allocated once (page-locked when ``pin_memory`` is set, so a
+    later ``.to(device, non_blocking=True)`` is a true async DMA) and each
+    decoded image is rescaled and transposed straight into its slot in a
+    single pass, without per-image float arrays or a ``torch.stack`` copy.
+    """
+    import cv2
     import torch
 
-    tensors = []
-    for img_bytes in images:
-        img = Image.open(io.BytesIO(img_bytes)).convert("RGB").resize(target_size)
-        arr = np.array(img, dtype=np.float32) / 255.0
-        tensors.append(torch.from_numpy(arr).permute(2, 0, 1))
-    return torch.stack(tensors)
-
-
-def batch_tensor_to_images(tensor) -> list[bytes]:
-    results: list[bytes] = []
-    for i in range(tensor.shape[0]):
-        arr = tensor[i].clamp(0, 1).permute(1, 2, 0).cpu().numpy()
-        arr_uint8 = (arr * 255).astype(np.uint8)
-        img = Image.fromarray(arr_uint8)
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        results.append(buf.getvalue())
-    return results
+    width, height = target_size
+    batch = torch.empty((len(images), 3, height, width), dtype=torch.float32, pin_memory=pin_memory)
+    # Pinned or not, the CPU tensor is one contiguous buffer: a zero-copy numpy view
+    out = batch.numpy()
+    for i, img_bytes in enumerate(images):
+        rgb = decode_rgb(img_bytes)
+        if rgb.shape[:2] != (height, width):
+            rgb = cv2.resize(rgb, target_size, interpolation=cv2.INTER_CUBIC)
+        if NUMBA_AVAILABLE:
+            _hwc_to_chw_unit(rgb, out[i])
+        else:
+            np.multiply(rgb.transpose(2, 0, 1), np.float32(1.0 / 255.0), out=out[i])
+    return batch
+
+
+def batch_tensor_to_images(tensor, frame_encoding: FrameEncoding = "png") -> list[bytes]:
+    """Encode a (B, 3, H, W) batch in [0, 1]; PNG by default since batch outputs go to the client."""
+    import torch
+
+    # One fused uint8 conversion and one host copy for the whole batch
+    frames = tensor.clamp(0, 1).mul_(255).round_().to(torch.uint8).permute(0, 2, 3, 1).contiguous()
+    if frames.is_cuda:
+        host = torch.empty(frames.shape, dtype=torch.uint8, pin_memory=True)
+        host.copy_(frames, non_blocking=True)
+        torch.cuda.current_stream().synchronize()
+        frames = host
+    return [encode_frame(arr, frame_encoding) for arr in frames.numpy()]
 
 
 async def process_batch(
@@ -41,28 +83,97 @@ async def process_batch(
     batch_size: int = 4,
     device: str = "cpu",
     on_progress: Optional[Callable[[int, int], None]] = None,
+    target_size: tuple[int, int] = (512, 512),
 ) -> list[bytes]:
     import torch
 
     total = len(images)
-    results: list[bytes | None] = [None] * total
+    # Failed batches keep their input bytes, so the input is the default result
+    results: list[bytes] = list(images)
 
+    cuda = device.startswith("cuda") and torch.cuda.is_available()
+    copy_stream = torch.cuda.Stream() if cuda else None
+
+    def upload(batch_images: list[bytes]):
+        cpu_tensor = images_to_batch_tensor(batch_images, target_size, pin_memory=cuda)
+        if not cuda:
+            return cpu_tensor.to(device), None
+        # H2D on a side stream so it overlaps the model running on the default stream
+        with torch.cuda.stream(copy_stream):
+            gpu_tensor = cpu_tensor.to(device, non_blocking=True)
+            ready = torch.cuda.Event()
+            ready.record(copy_stream)
+        return gpu_tensor, ready
+
+    staged = None
     for start in range(0, total, batch_size):
         end = min(start + batch_size, total)
-        batch_images = images[start:end]
         try:
-            batch_tensor = images_to_batch_tensor(batch_images).to(device)
-            with torch.no_grad():
+            # Slice only when the batch was not already staged by the previous iteration
+            batch_tensor, ready = staged if staged is not None else upload(images[start:end])
+            staged = None
+            if ready is not None:
+                compute_stream = torch.cuda.current_stream()
+                compute_stream.wait_event(ready)
+                batch_tensor.record_stream(compute_stream)
+            # fp16 autocast puts convolutions on tensor cores; CPU stays fp32
+            with torch.inference_mode(), torch.autocast("cuda", dtype=torch.float16, enabled=cuda):
                 output_tensor = model_fn(batch_tensor)
-            batch_results = batch_tensor_to_images(output_tensor.cpu())
-            for i, result in enumerate(batch_results):
-                results[start + i] = result
+
+            # Decode and upload the next batch while this one is still computing
+            if cuda and end < total:
+                try:
+                    staged = upload(images[end:min(end + batch_size, total)])
+                except Exception:
+                    staged = None  # re-raised and handled in its own iteration
+
+            results[start:end] = batch_tensor_to_images(output_tensor)
         except Exception as exc:
             logger.error("Batch [%d:%d] failed: %s", start, end, exc)
-            for i in range(len(batch_images)):
-                results[start + i] = batch_images[i]
 
         if on_progress:
             on_progress(end, total)
 
-    return [r if r is not None else b"" for r in results]
+    return results
+
+
+async def process_batch_by_size(
+    images: list[bytes],
+    model_fn: Callable,
+    fallback: Callable[[bytes], Awaitable[bytes]],
+    batch_size: int = 4,
+    max_side: Optional[int] = None,
+    min_side: Optional[int] = None,
+) -> list[bytes]:
+    """Batch images of equal size at their native resolution.
+
+    ``process_batch`` stacks images into one tensor, so each group shares a
+    (width, height). Images outside ``min_side``..``max_side`` or that cannot
+    be decoded go through ``fallback`` one at a time.
+    """
+    import torch
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    results = list(images)
+    groups: dict[tuple[int, int], list[int]] = {}
+    for i, img_bytes in enumerate(images):
+        try:
+            size = Image.open(io.BytesIO(img_bytes)).size
+        except Exception:
+            size = None
+        if (
+            size is None
+            or (max_side is not None and max(size) > max_side)
+            or (min_side is not None and min(size) < min_side)
+        ):
+            results[i] = await fallback(img_bytes)
+        else:
+            groups.setdefault(size, []).append(i)
+
+    for size, indices in groups.items():
+        outs = await process_batch(
+            [images[i] for i in indices], model_fn, batch_size=batch_size, device=device, target_size=size
+        )
+        for i, out in zip(indices, outs):
+            results[i] = out
+    return results
@@ -2,9 +2,13 @@
 
 from __future__ import annotations
 
+import itertools
 import logging
 from dataclasses import dataclass
 from threading import Lock
+from typing import Optional
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -21,13 +25,41 @@ class GpuSlot:
 
 
 class GpuRouter:
+    """Routes tasks to per-GPU queues.
+
+    Slots are discovered once and stored as parallel arrays indexed by slot
+    position (Struct-of-Arrays): task counters, memory and health are numpy
+    columns, so the hot paths are an index update or one argmin.
+    ``GpuSlot`` is the public per-slot view.
+    """
+
     def __init__(self):
-        self._slots: list[GpuSlot] = []
         self._lock = Lock()
-        self._rr_index = 0
-        self._discover()
+        slots = self._discover()
+        self._device_ids = np.array([s.device_id for s in slots], dtype=np.int32)
+        self._device_names = [s.device_name for s in slots]
+        self._queue_names = np.array([s.queue_name for s in slots], dtype=object)
+        self._active = np.zeros(len(slots), dtype=np.int32)
+        self._total_mb = np.array([s.total_memory_mb for s in slots], dtype=np.int64)
+        self._free_mb = np.array([s.free_memory_mb for s in slots], dtype=np.int64)
+        self._healthy_mask = np.array([s.is_healthy for s in slots], dtype=bool)
+        self._idx: dict[str, int] = {s.queue_name: i for i, s in enumerate(slots)}
+        self._refresh_healthy()
+
+    def _refresh_healthy(self):
+        """Rebuild healthy indices and the round-robin cycle; call under the lock on health changes."""
+        self._healthy = np.flatnonzero(self._healthy_mask)
+        self._rr = itertools.cycle(self._healthy.tolist())
+
+    def set_healthy(self, queue_name: str, healthy: bool):
+        with self._lock:
+            i = self._idx.get(queue_name)
+            if i is not None and self._healthy_mask[i] != healthy:
+                self._healthy_mask[i] = healthy
+                self._refresh_healthy()
 
-    def _discover(self):
+    def _discover(self) -> list[GpuSlot]:
+        slots: list[GpuSlot] = []
         try:
             import torch
 
@@ -41,65 +73,92 @@ class GpuRouter:
                         total_memory_mb=props.total_memory // (1024 * 1024),
                         free_memory_mb=props.total_memory // (1024 * 1024),
                     )
-                    self._slots.append(slot)
+                    slots.append(slot)
                     logger.info("Discovered GPU %d: %s", i, props.name)
         except Exception:
             pass
 
-        if not self._slots:
-            self._slots.append(GpuSlot(device_id=-1, device_name="CPU", queue_name="cpu"))
+        if not slots:
+            slots.append(GpuSlot(device_id=-1, device_name="CPU", queue_name="cpu"))
             logger.info("No GPU found — using CPU queue")
+        return slots
 
     def get_best_queue(self, strategy: str = "least_loaded") -> str:
         with self._lock:
-            healthy = [s for s in self._slots if s.is_healthy]
-            if not healthy:
+            healthy = self._healthy
+            if not healthy.size:
                 return "celery"
             if strategy == "least_loaded":
-                return min(healthy, key=lambda s: s.active_tasks).queue_name
+                return self._queue_names[healthy[int(self._active[healthy].argmin())]]
             if strategy == "round_robin":
-                slot = healthy[self._rr_index % len(healthy)]
-                self._rr_index += 1
-                return slot.queue_name
-            return healthy[0].queue_name
+                return self._queue_names[next(self._rr)]
+            return self._queue_names[healthy[0]]
 
     def increment(self, queue_name: str):
         with self._lock:
-            for slot in self._slots:
-                if slot.queue_name == queue_name:
-                    slot.active_tasks += 1
+            i = self._idx.get(queue_name)
+            if i is not None:
+                self._active[i] += 1
 
     def decrement(self, queue_name: str):
         with self._lock:
-            for slot in self._slots:
-                if slot.queue_name == queue_name:
-                    slot.active_tasks = max(0, slot.active_tasks - 1)
+            i = self._idx.get(queue_name)
+            if i is not None and self._active[i] > 0:
+                self._active[i] -= 1
+
+    def slot(self, queue_name: str) -> Optional[GpuSlot]:
+        """Snapshot of one slot as a ``GpuSlot``."""
+        with self._lock:
+            i = self._idx.get(queue_name)
+            if i is None:
+                return None
+            return GpuSlot(
+                device_id=int(self._device_ids[i]),
+                device_name=self._device_names[i],
+                queue_name=queue_name,
+                active_tasks=int(self._active[i]),
+                total_memory_mb=int(self._total_mb[i]),
+                free_memory_mb=int(self._free_mb[i]),
+                is_healthy=bool(self._healthy_mask[i]),
+            )
 
     def status(self) -> list[dict]:
+        # mem_get_info is a driver call: query outside the lock so task
+        # start/end bookkeeping is never blocked behind it
+        memory: dict[int, tuple[int, int]] = {}
+        for i in np.flatnonzero(self._device_ids >= 0).tolist():
+            try:
+                import torch
+
+                memory[i] = torch.cuda.mem_get_info(int(self._device_ids[i]))
+            except Exception:
+                pass
+
         with self._lock:
-            result = []
-            for slot in self._slots:
-                try:
-                    import torch
-
-                    if slot.device_id >= 0:
-                        free, total = torch.cuda.mem_get_info(slot.device_id)
-                        slot.free_memory_mb = free // (1024 * 1024)
-                        slot.total_memory_mb = total // (1024 * 1024)
-                except Exception:
-                    pass
-                result.append(
-                    {
-                        "device_id": slot.device_id,
-                        "device_name": slot.device_name,
-                        "queue": slot.queue_name,
-                        "active_tasks": slot.active_tasks,
-                        "total_memory_mb": slot.total_memory_mb,
-                        "free_memory_mb": slot.free_memory_mb,
-                        "healthy": slot.is_healthy,
-                    }
-                )
-            return result
+            for i, (free, total) in memory.items():
+                self._free_mb[i] = free // (1024 * 1024)
+                self._total_mb[i] = total // (1024 * 1024)
+            columns = zip(
+                self._device_ids.tolist(),
+                self._device_names,
+                self._queue_names.tolist(),
+                self._active.tolist(),
+                self._total_mb.tolist(),
+                self._free_mb.tolist(),
+                self._healthy_mask.tolist(),
+            )
+            return [
+                {
+                    "device_id": device_id,
+                    "device_name": name,
+                    "queue": queue,
+                    "active_tasks": active,
+                    "total_memory_mb": total_mb,
+                    "free_memory_mb": free_mb,
+                    "healthy": healthy,
+                }
+                for device_id, name, queue, active, total_mb, free_mb, healthy in columns
+            ]
 
 
 gpu_router = GpuRouter()
@@ -0,0 +1,95 @@
+"""Same-host task payloads through shared memory instead of base64 in Redis.
+
+A producer on the same machine as the worker writes image bytes to a file
+under a tmpfs directory and sends only a small handle through the broker:
+``{"shm": "<name>", "len": N}``. The worker reads the file directly, so
+the bytes never go through base64, JSON or Redis. Producers on other
+hosts keep sending base64 strings; tasks accept both. Results still go back
+as base64.
+
+Reading does not remove a payload: the task may be retried. Input handles are
+released once the task reaches a final state, and :func:`sweep` removes
+anything older than ``SHM_TTL_S`` that nobody released.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Union
+
+SHM_DIR = Path(
+    os.environ.get("PLAYE_SHM_DIR")
+    or ("/dev/shm/playe" if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir()) / "playe-shm")
+)
+
+SHM_TTL_S = int(os.environ.get("PLAYE_SHM_TTL_S", "3600"))
+# publish() sweeps at most this often per process
+SWEEP_INTERVAL_S = 300
+
+Payload = Union[bytes, bytearray, memoryview]
+
+_last_sweep = 0.0
+
+
+def is_handle(value: Any) -> bool:
+    return isinstance(value, dict) and "shm" in value
+
+
+def _path(handle: dict[str, Any]) -> Path:
+    return SHM_DIR / Path(handle["shm"]).name
+
+
+def publish(data: Payload) -> dict[str, Any]:
+    """Store ``data`` in shared memory and return the handle to send instead of it."""
+    global _last_sweep
+    SHM_DIR.mkdir(parents=True, exist_ok=True)
+    now = time.monotonic()
+    if now - _last_sweep >= SWEEP_INTERVAL_S:
+        _last_sweep = now
+        sweep()
+    name = uuid.uuid4().hex
+    with open(SHM_DIR / name, "wb") as f:
+        f.write(data)
+    return {"shm": name, "len": len(data)}
+
+
+def read(handle: dict[str, Any]) -> bytes:
+    """Bytes of a published payload; the backing file is left in place.
+
+    Plain ``bytes``, not a mapping: failed images are returned as their input,
+    and a mapped view must not outlive the file or end up in a task result.
+    """
+    if handle.get("len", 0) == 0:
+        return b""
+    return _path(handle).read_bytes()
+
+
+def release(values: Any) -> None:
+    """Remove the backing files of every handle in ``values``; other items are ignored."""
+    if not isinstance(values, (list, tuple)):
+        return
+    for value in values:
+        if is_handle(value):
+            _path(value).unlink(missing_ok=True)
+
+
+def sweep(max_age_s: float = SHM_TTL_S) -> int:
+    """Remove payloads older than ``max_age_s`` that were never released."""
+    cutoff = time.time() - max_age_s
+    removed = 0
+    try:
+        entries = list(os.scandir(SHM_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -3,17 +3,34 @@
 from __future__ import annotations
 
 import asyncio
-import base64
+from functools import partial
 from typing import Any
 
-from app.models.denoise import denoise_image
-from app.models.detect_faces import detect_faces
-from app.models.detect_objects import detect_objects
-from app.models.face_enhance import enhance_face
-from app.models.upscale import upscale_image
-from app.models.video_pipeline import detect_scene_changes, extract_frames, process_video_frames
+from celery import states
+
+from app.models.denoise import _denoise_batch, denoise_frame, denoise_image, denoise_image_sync
+from app.models.detect_faces import detect_faces_sync
+from app.models.detect_objects import detect_objects, detect_objects_sync
+from app.models.face_enhance import enhance_face_sync
+from app.models.upscale import TRT_MAX_BATCH, TRT_TILE, _upscale_batch, upscale_image, upscale_image_sync
+from app.models.video_pipeline import detect_scene_changes, encode_frame, extract_frames, process_video_frames
+from app.queue import shmem
+from app.queue.batch import process_batch_by_size
 from app.queue.worker import celery_app
 
+try:
+    # SIMD (AVX2/SSSE3/NEON) base64, API-compatible with the stdlib module
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# The Real-ESRGAN TensorRT profile is built for batches of up to this size
+BATCH_SIZE = TRT_MAX_BATCH
+# Smaller images gain nothing from batching: per-image RealESRGANer path
+UPSCALE_BATCH_MIN_SIDE = 64
+# NAFNet runs whole images: bigger ones are denoised one at a time to bound VRAM
+DENOISE_BATCH_MAX_SIDE = 1024
+
 TASK_RETRY_OPTS = {
     "autoretry_for": (Exception,),
     "retry_backoff": True,
@@ -22,45 +39,66 @@ TASK_RETRY_OPTS = {
 }
 
 
+def _run_sync(coro: Any) -> Any:
+    """Run a coroutine on the worker process's persistent event loop."""
+    loop = getattr(celery_app, "_loop", None)
+    if loop is None or loop.is_closed():
+        # Eager mode / solo pool without worker_process_init
+        loop = celery_app._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coro)
+
+
 def _encode_image_result(result: Any) -> Any:
     if isinstance(result, (bytes, bytearray)):
         return {"image_base64": base64.b64encode(bytes(result)).decode("ascii"), "mime_type": "image/png"}
     return result
 
 
-def _decode_images_b64(images_b64: list[str]) -> list[bytes]:
-    return [base64.b64decode(v) for v in images_b64]
-
-
 def _encode_images_b64(images: list[bytes]) -> list[str]:
     return [base64.b64encode(v).decode("ascii") for v in images]
 
 
+def _decode_images(payload: list[Any]) -> list[bytes]:
+    """Inputs are base64 strings or, from a producer on this host, shared-memory handles."""
+    return [shmem.read(v) if shmem.is_handle(v) else base64.b64decode(v, validate=False) for v in payload]
+
+
+class _ShmBatchTask(celery_app.Task):
+    """Releases shared-memory inputs only once the task is final.
+
+    A retry (autoretry_for) re-reads the same handles, so they must survive
+    until SUCCESS/FAILURE/REVOKED rather than being removed on first read.
+    """
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        if status in states.READY_STATES:
+            shmem.release(args[0] if args else kwargs.get("images_b64"))
+
+
 @celery_app.task(name="tasks.face_enhance", **TASK_RETRY_OPTS)
 def face_enhance_task(image: bytes) -> Any:
-    return _encode_image_result(asyncio.run(enhance_face(image)))
+    return _encode_image_result(enhance_face_sync(image))
 
 
 @celery_app.task(name="tasks.upscale", **TASK_RETRY_OPTS)
 def upscale_task(image: bytes, factor: int = 2) -> Any:
-    return _encode_image_result(asyncio.run(upscale_image(image, factor)))
+    return _encode_image_result(upscale_image_sync(image, factor))
 
 
 @celery_app.task(name="tasks.denoise", **TASK_RETRY_OPTS)
 def denoise_task(image: bytes, level: str = "light") -> Any:
-    return _encode_image_result(asyncio.run(denoise_image(image, level)))
+    return _encode_image_result(denoise_image_sync(image, level))
 
 
 @celery_app.task(name="tasks.detect_faces", **TASK_RETRY_OPTS)
 def detect_faces_task(image: bytes) -> Any:
-    return asyncio.run(detect_faces(image))
+    return detect_faces_sync(image)
 
 
 @celery_app.task(name="tasks.detect_objects", **TASK_RETRY_OPTS)
 def detect_objects_task(image: bytes, scene_threshold: float | None = None, temporal_window: int | None = None) -> Any:
-    return asyncio.run(
-        detect_objects(image, scene_threshold=scene_threshold, temporal_window=temporal_window)
-    )
+    return detect_objects_sync(image, scene_threshold=scene_threshold, temporal_window=temporal_window)
 
 
 @celery_app.task(name="tasks.video_temporal_denoise", **TASK_RETRY_OPTS)
@@ -70,57 +108,68 @@ def video_temporal_denoise_task(video: bytes, fps: float = 1.0) -> Any:
             video_bytes=video,
             operation="temporal_denoise",
             params={},
-            frame_processor=lambda frame, _: denoise_image(frame, "medium"),
+            frame_processor=lambda frame, _: denoise_frame(frame, "medium"),
             fps=fps,
         )
 
-    return asyncio.run(_run())
+    return _run_sync(_run())
 
 
 @celery_app.task(name="tasks.video_scene_detect", **TASK_RETRY_OPTS)
 def video_scene_detect_task(video: bytes, scene_threshold: float = 28.0, temporal_window: int = 3) -> Any:
     async def _run():
-        frames = await extract_frames(video, fps=2.0)
-        scenes = await detect_scene_changes(frames, threshold=scene_threshold)
+        frames, thumbs = await extract_frames(video, fps=2.0, with_thumbnails=True)
+        scenes = await detect_scene_changes(thumbs, threshold=scene_threshold)
         scene_objects = []
         for idx in scenes:
             if idx < len(frames):
                 objs = await detect_objects(
-                    frames[idx],
+                    # Intermediate frame for YOLO only: JPEG is enough
+                    encode_frame(frames[idx], "jpeg"),
                     scene_threshold=scene_threshold,
                     temporal_window=temporal_window,
                 )
                 scene_objects.append({"frame": idx, "objects": objs})
         return {"total_frames": len(frames), "scene_cuts": scenes, "scene_objects": scene_objects}
 
-    return asyncio.run(_run())
+    return _run_sync(_run())
 
 
-@celery_app.task(name="tasks.batch_upscale", **TASK_RETRY_OPTS)
-def batch_upscale_task(images_b64: list[str], factor: int = 2) -> Any:
+@celery_app.task(name="tasks.batch_upscale", base=_ShmBatchTask, **TASK_RETRY_OPTS)
+def batch_upscale_task(images_b64: list[Any], factor: int = 2) -> Any:
     async def _run():
-        imgs = _decode_images_b64(images_b64)
-        outs = [await upscale_image(img, factor) for img in imgs]
+        imgs = _decode_images(images_b64)
+        # Tile-sized images share one forward per batch; larger ones keep RealESRGANer tiling
+        outs = await process_batch_by_size(
+            imgs,
+            partial(_upscale_batch, factor=factor),
+            fallback=lambda img: upscale_image(img, factor),
+            batch_size=BATCH_SIZE,
+            max_side=TRT_TILE,
+            min_side=UPSCALE_BATCH_MIN_SIDE,
+        )
         return {"images_base64": _encode_images_b64(outs), "count": len(outs)}
 
-    return asyncio.run(_run())
+    return _run_sync(_run())
 
 
-@celery_app.task(name="tasks.batch_denoise", **TASK_RETRY_OPTS)
-def batch_denoise_task(images_b64: list[str], level: str = "medium") -> Any:
+@celery_app.task(name="tasks.batch_denoise", base=_ShmBatchTask, **TASK_RETRY_OPTS)
+def batch_denoise_task(images_b64: list[Any], level: str = "medium") -> Any:
     async def _run():
-        imgs = _decode_images_b64(images_b64)
-        outs = [await denoise_image(img, level) for img in imgs]
+        imgs = _decode_images(images_b64)
+        outs = await process_batch_by_size(
+            imgs,
+            partial(_denoise_batch, level=level),
+            fallback=lambda img: denoise_image(img, level),
+            batch_size=BATCH_SIZE,
+            max_side=DENOISE_BATCH_MAX_SIDE,
+        )
         return {"images_base64": _encode_images_b64(outs), "count": len(outs)}
 
-    return asyncio.run(_run())
-
+    return _run_sync(_run())
 
-@celery_app.task(name="tasks.batch_face_enhance", **TASK_RETRY_OPTS)
-def batch_face_enhance_task(images_b64: list[str]) -> Any:
-    async def _run():
-        imgs = _decode_images_b64(images_b64)
-        outs = [await enhance_face(img) for img in imgs]
-        return {"images_base64": _encode_images_b64(outs), "count": len(outs)}
 
-    return asyncio.run(_run())
+@celery_app.task(name="tasks.batch_face_enhance", base=_ShmBatchTask, **TASK_RETRY_OPTS)
+def batch_face_enhance_task(images_b64: list[Any]) -> Any:
+    outs = [enhance_face_sync(img) for img in _decode_images(images_b64)]
+    return {"images_base64": _encode_images_b64(outs), "count": len(outs)}
@@ -2,15 +2,42 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
 
 from celery import Celery
-from celery.signals import task_postrun, task_prerun
+from celery.signals import task_postrun, task_prerun, worker_process_init, worker_process_shutdown
 
 from app.queue.gpu_router import gpu_router
 
+logger = logging.getLogger(__name__)
+
+# Размер прогревочного кадра: тайл Real-ESRGAN и target_size батчей по умолчанию
+WARMUP_SIZE = 512
+# Прогрев идёт в worker_process_init, до того как дочерний процесс отчитается
+# пулу; дефолтные 4 с prefork не хватит на загрузку моделей и автотюнинг
+WORKER_PROC_ALIVE_TIMEOUT = 300.0
+
+
+def _configure_torch() -> None:
+    """Процесс-глобальные настройки инференса: TF32-матмулы.
+
+    cudnn.benchmark глобально не включается: батчи идут в родном размере
+    группы, краевые тайлы и кадры видео тоже разные, и каждое новое
+    разрешение стоило бы отдельного автотюнинга. Он включён только там, где
+    форма действительно фиксирована, — при захвате графа 512-тайлов
+    (app.models.realesrgan).
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_float32_matmul_precision("high")
+
 
 def create_celery_app() -> Celery:
+    _configure_torch()
     celery_app = Celery(
         "playe_photo_lab",
         broker=os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
@@ -30,6 +57,7 @@ def create_celery_app() -> Celery:
         result_serializer="json",
         task_soft_time_limit=300,
         task_time_limit=600,
+        worker_proc_alive_timeout=WORKER_PROC_ALIVE_TIMEOUT,
     )
     celery_app.autodiscover_tasks(["app.queue"])
     return celery_app
@@ -38,6 +66,82 @@ def create_celery_app() -> Celery:
 celery_app = create_celery_app()
 
 
+@worker_process_init.connect
+def on_worker_process_init(**kwargs):
+    # Один event loop на процесс-воркер: задачи не создают и не закрывают
+    # loop на каждый вызов, пулы соединений внутри корутин живут между задачами
+    celery_app._loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(celery_app._loop)
+    try:
+        import torch
+
+        # Воркер только инферит: autograd не нужен ни одной задаче
+        torch.set_grad_enabled(False)
+    except ImportError:
+        pass
+    _warm_models()
+
+
+def _consumes_gpu_queue() -> bool:
+    """Слушает ли процесс очередь gpu_* (-Q применён до форка дочерних процессов)."""
+    queues = getattr(celery_app.amqp.queues, "consume_from", None) or {}
+    return any(str(name).startswith("gpu_") for name in queues)
+
+
+def _warm_models() -> None:
+    """Загрузка моделей и один холостой прогон до первой задачи.
+
+    Иначе первая задача платит за загрузку весов и автотюнинг cuDNN
+    (секунды), пока тикает её soft time limit. Только на воркерах очередей
+    gpu_*: процессы -Q cpu на GPU-хосте не держат тяжёлые модели на cuda:0.
+    """
+    if not _consumes_gpu_queue():
+        return
+    try:
+        import numpy as np
+        import torch
+    except ImportError:
+        return
+    if not torch.cuda.is_available():
+        return
+    dummy = np.zeros((WARMUP_SIZE, WARMUP_SIZE, 3), dtype=np.uint8)
+
+    def upscale():
+        from app.models.upscale import _ensure_realesrgan_weights, _get_upscaler
+
+        if _ensure_realesrgan_weights()[1] >= 1_000_000:
+            _get_upscaler(2).enhance(dummy, outscale=2)
+
+    def denoise():
+        from app.models.denoise import _load_nafnet
+
+        _load_nafnet().denoise(dummy)
+
+    def face_enhance():
+        from app.models.face_enhance import _load_gfpgan
+
+        model = _load_gfpgan()
+        if model is not None:
+            model.enhance(dummy, has_aligned=False, only_center_face=False, paste_back=True)
+
+    for name, warm in (("upscale", upscale), ("denoise", denoise), ("face_enhance", face_enhance)):
+        try:
+            warm()
+            logger.info("Модель %s прогрета", name)
+        except Exception as exc:
+            logger.warning("Прогрев %s не удался: %s", name, exc)
+    torch.cuda.synchronize()
+
+
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(**kwargs):
+    # Срабатывает и при перезапуске по worker_max_tasks_per_child
+    loop = getattr(celery_app, "_loop", None)
+    if loop is not None and not loop.is_closed():
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
 @task_prerun.connect
 def on_task_start(task_id, task, **kwargs):
     queue = kwargs.get("routing_key", "cpu")
@@ -51,6 +155,8 @@ def on_task_end(task_id, task, **kwargs):
 
 
 if __name__ == "__main__":
+    # На GPU-хосте один раз перед запуском собрать TensorRT-движок Real-ESRGAN
+    # (минуты; внутри задачи не строится): python -m app.models.upscale
     # Запускать отдельный воркер для каждой GPU:
     # celery -A app.queue.worker worker -Q gpu_0 --concurrency=1 --loglevel=info
     # celery -A app.queue.worker worker -Q gpu_1 --concurrency=1 --loglevel=info
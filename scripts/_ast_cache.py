@@ -0,0 +1,84 @@
+"""Memoized ast.parse for the backend sources the check scripts read."""
+
+from __future__ import annotations
+
+import __future__
+import ast
+import functools
+import os
+import re
+import sys
+import types
+from pathlib import Path
+
+# The backend modules use postponed annotations; the extracted slices compile
+# the same way regardless of this module's own __future__ imports
+_COMPILE_FLAGS = __future__.annotations.compiler_flag
+
+# A new top-level statement: name, keyword or decorator at column 0. Closing
+# brackets and comments at column 0 stay inside the current block.
+_TOP_LEVEL_START = re.compile(rb"^[A-Za-z_@]", re.M)
+
+
+@functools.lru_cache(maxsize=16)
+def _read(path: str, mtime_ns: int, size: int) -> bytes:
+    return Path(path).read_bytes()
+
+
+@functools.lru_cache(maxsize=32)
+def _parse(path: str, mtime_ns: int, size: int) -> ast.Module:
+    return ast.parse(_read(path, mtime_ns, size), filename=path)
+
+
+def read_source(path: Path) -> bytes:
+    """Raw bytes of ``path``; re-read only when the file changes on disk."""
+    st = os.stat(path)
+    return _read(str(path), st.st_mtime_ns, st.st_size)
+
+
+def load_tree(path: Path) -> ast.Module:
+    """Parsed module for ``path``; re-parsed only when the file changes on disk.
+
+    The tree is shared between callers: select nodes from it, do not mutate them.
+    """
+    st = os.stat(path)
+    return _parse(str(path), st.st_mtime_ns, st.st_size)
+
+
+def load_blocks(path: Path, *heads: bytes) -> list[ast.stmt]:
+    """Top-level statements whose first line starts with one of ``heads``.
+
+    Only those source ranges are parsed, not the whole module. Line numbers
+    match the original file.
+    """
+    source = read_source(path)
+    nodes: list[ast.stmt] = []
+    for head in heads:
+        found = re.search(rb"^" + re.escape(head), source, re.M)
+        if found is None:
+            raise RuntimeError(f"{head.decode()!r} not found in {path}")
+        end = _TOP_LEVEL_START.search(source, found.end())
+        block = ast.parse(source[found.start() : end.start() if end else len(source)], filename=str(path))
+        ast.increment_lineno(block, source.count(b"\n", 0, found.start()))
+        nodes.extend(block.body)
+    nodes.sort(key=lambda node: node.lineno)
+    return nodes
+
+
+def load_code(module: ast.Module, filename: str):
+    # Default optimization level: asserts and docstrings stay, as on the server
+    return compile(module, filename, "exec", flags=_COMPILE_FLAGS, dont_inherit=True)
+
+
+def exec_slice(name: str, module: ast.Module, filename: str, namespace: dict) -> types.ModuleType:
+    """Exec the extracted ``module`` as ``sys.modules[name]``.
+
+    Loaders check ``sys.modules`` first, so a script re-imported by a runner
+    reuses the already executed slice instead of selecting and exec-ing again.
+    """
+    mod = types.ModuleType(name)
+    mod.__file__ = filename
+    mod.__dict__.update(namespace)
+    exec(load_code(module, filename), mod.__dict__)
+    sys.modules[name] = mod
+    return mod
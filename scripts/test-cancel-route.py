@@ -6,20 +6,16 @@ import ast
 import asyncio
 from pathlib import Path
 
+from _ast_cache import load_blocks, load_code
 
-def load_cancel_fn():
-    routes_path = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "routes.py"
-    source = routes_path.read_text(encoding="utf-8")
-    tree = ast.parse(source)
 
-    cancel_node = None
-    for node in tree.body:
-        if isinstance(node, ast.AsyncFunctionDef) and node.name == "cancel_job":
-            cancel_node = node
-            break
+ROUTES_PATH = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "routes.py"
+ROUTES_PATH_STR = str(ROUTES_PATH)
+
 
-    if cancel_node is None:
-        raise RuntimeError("cancel_job not found")
+def load_cancel_fn():
+    # Parse only the cancel_job block, not the whole router module
+    cancel_node = load_blocks(ROUTES_PATH, b"async def cancel_job(")[0]
 
     cancel_node.decorator_list = []
     cancel_node.args.defaults = [ast.Constant(value=None) for _ in cancel_node.args.defaults]
@@ -40,7 +36,7 @@ def load_cancel_fn():
         "Request": object,
         "_log_enterprise_action": lambda *_args, **_kwargs: None,
     }
-    exec(compile(module, str(routes_path), "exec"), namespace)
+    exec(load_code(module, ROUTES_PATH_STR), namespace)
     return namespace["cancel_job"], namespace
 
 
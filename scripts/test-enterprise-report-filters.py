@@ -7,6 +7,10 @@ from datetime import datetime, timezone
 from pathlib import Path
 from types import SimpleNamespace
 
+from _ast_cache import load_tree
+
+REPORTS_PATH = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "enterprise_reports.py"
+
 
 class HTTPException(Exception):
     def __init__(self, status_code: int, detail: str):
@@ -16,14 +20,14 @@ class HTTPException(Exception):
 
 
 def load_helpers():
-    reports_path = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "enterprise_reports.py"
-    source = reports_path.read_text(encoding="utf-8")
-    tree = ast.parse(source)
+    tree = load_tree(REPORTS_PATH)
 
     wanted = {"_jwt_payload", "_resolve_team_scope", "_parse_iso_utc", "_normalize_audit_filters"}
+    # Local: the class resolves with LOAD_FAST instead of ast.<attr> per node
+    FunctionDef = ast.FunctionDef
     selected = []
     for candidate in tree.body:
-        if isinstance(candidate, ast.FunctionDef) and candidate.name in wanted:
+        if isinstance(candidate, FunctionDef) and candidate.name in wanted:
             selected.append(candidate)
 
     found = {node.name for node in selected}
@@ -41,7 +45,7 @@ def load_helpers():
         "datetime": datetime,
         "timezone": timezone,
     }
-    exec(compile(module, str(reports_path), "exec"), namespace)
+    exec(compile(module, str(REPORTS_PATH), "exec"), namespace)
 
     return (
         namespace["_parse_iso_utc"],
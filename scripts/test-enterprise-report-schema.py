@@ -5,6 +5,7 @@ from __future__ import annotations
 import ast
 from pathlib import Path
 
+from _ast_cache import load_tree
 
 REPORTS_PATH = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "enterprise_reports.py"
 
@@ -45,7 +46,7 @@ def _assert(condition: bool, msg: str):
 
 
 def main() -> None:
-    tree = ast.parse(REPORTS_PATH.read_text(encoding="utf-8"))
+    tree = load_tree(REPORTS_PATH)
 
     json_routes = []
     csv_routes = []
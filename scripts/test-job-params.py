@@ -3,8 +3,16 @@
 from __future__ import annotations
 
 import ast
+import sys
+from functools import lru_cache
 from pathlib import Path
 
+from _ast_cache import exec_slice, load_blocks
+
+ROUTES_PATH = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "routes.py"
+ROUTES_PATH_STR = str(ROUTES_PATH)
+SLICE_NAME = "_routes_slice_job_params"
+
 
 class HTTPException(Exception):
     def __init__(self, status_code: int, detail: str):
@@ -13,32 +21,17 @@ class HTTPException(Exception):
         self.detail = detail
 
 
+@lru_cache(maxsize=1)
 def load_normalize_fn():
-    routes_path = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "routes.py"
-    source = routes_path.read_text(encoding="utf-8")
-    tree = ast.parse(source)
-
-    selected_nodes = []
-    for node in tree.body:
-        if isinstance(node, ast.Assign):
-            targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
-            if "PRESET_DEFAULTS" in targets:
-                selected_nodes.append(node)
-        if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and node.target.id == "PRESET_DEFAULTS":
-            selected_nodes.append(node)
-        if isinstance(node, ast.FunctionDef) and node.name == "normalize_job_params":
-            selected_nodes.append(node)
-            break
-
-    if not selected_nodes:
-        raise RuntimeError("normalize_job_params not found")
+    if SLICE_NAME in sys.modules:
+        return sys.modules[SLICE_NAME].normalize_job_params
 
+    # Parse just the preset table and the function, not the whole router module
+    selected_nodes = load_blocks(ROUTES_PATH, b"PRESET_DEFAULTS", b"def normalize_job_params(")
     module = ast.Module(body=selected_nodes, type_ignores=[])
-    ast.fix_missing_locations(module)
 
     namespace = {"HTTPException": HTTPException, "Dict": dict, "Any": object, "Tuple": tuple, "List": list}
-    exec(compile(module, str(routes_path), "exec"), namespace)
-    return namespace["normalize_job_params"]
+    return exec_slice(SLICE_NAME, module, ROUTES_PATH_STR, namespace).normalize_job_params
 
 
 def assert_equal(actual, expected, msg):
@@ -50,8 +43,8 @@ def assert_raises(fn, contains):
     try:
         fn()
     except Exception as exc:  # noqa: BLE001
-        detail = getattr(exc, "detail", str(exc))
-        if contains not in str(detail):
+        detail = exc.detail if isinstance(exc, HTTPException) else str(exc)
+        if contains not in detail:
             raise AssertionError(f"error detail mismatch: {detail!r}") from exc
         return
     raise AssertionError("expected exception was not raised")
@@ -59,38 +52,36 @@ def assert_raises(fn, contains):
 
 normalize_job_params = load_normalize_fn()
 
-op, args, meta = normalize_job_params("upscale", {"factor": "4"})
-assert_equal(op, "upscale", "operation normalize")
-assert_equal(args, [4], "upscale args")
-assert_equal(meta["factor"], 4, "upscale meta")
-
-op, args, meta = normalize_job_params("denoise", {"level": "heavy"})
-assert_equal(op, "denoise", "denoise op")
-assert_equal(args, ["heavy"], "denoise args")
-assert_equal(meta["level"], "heavy", "denoise meta")
-
-op, args, meta = normalize_job_params("detect_objects", {})
-assert_equal(args, [None, None], "detect_objects args")
-assert_equal(meta, {}, "detect_objects meta empty")
-
-op, args, meta = normalize_job_params("detect_objects", {"scene_threshold": 32.5, "temporal_window": 4})
-assert_equal(args, [32.5, 4], "detect_objects args with meta")
-assert_equal(meta["scene_threshold"], 32.5, "scene_threshold meta")
-assert_equal(meta["temporal_window"], 4, "temporal_window meta")
-
-op, args, meta = normalize_job_params("denoise", {"preset": "forensic_safe"})
-assert_equal(args, ["light"], "denoise preset default")
-assert_equal(meta["preset"], "forensic_safe", "preset value")
-
-op, args, meta = normalize_job_params("upscale", {"preset": "presentation"})
-assert_equal(args, [8], "upscale presentation default")
-
-assert_raises(lambda: normalize_job_params("upscale", {"factor": 3}), "one of 2, 4, 8")
-assert_raises(lambda: normalize_job_params("denoise", {"level": "x"}), "one of light, medium, heavy")
-assert_raises(lambda: normalize_job_params("detect_objects", {"scene_threshold": "abc"}), "scene_threshold must be numeric")
-assert_raises(lambda: normalize_job_params("detect_objects", {"scene_threshold": 120}), "between 0 and 100")
-assert_raises(lambda: normalize_job_params("detect_objects", {"temporal_window": 0}), "between 1 and 12")
-assert_raises(lambda: normalize_job_params("denoise", {"preset": "random"}), "preset must be one of")
-assert_raises(lambda: normalize_job_params("abc", {}), "Unsupported operation")
+# (operation, params) -> (operation, args, meta)
+CASES = [
+    ("upscale", {"factor": "4"}, ("upscale", [4], {"factor": 4})),
+    ("denoise", {"level": "heavy"}, ("denoise", ["heavy"], {"level": "heavy"})),
+    ("detect_objects", {}, ("detect_objects", [None, None], {})),
+    (
+        "detect_objects",
+        {"scene_threshold": 32.5, "temporal_window": 4},
+        ("detect_objects", [32.5, 4], {"scene_threshold": 32.5, "temporal_window": 4}),
+    ),
+    # preset defaults fill in the missing parameter
+    ("denoise", {"preset": "forensic_safe"}, ("denoise", ["light"], {"preset": "forensic_safe", "level": "light"})),
+    ("upscale", {"preset": "presentation"}, ("upscale", [8], {"preset": "presentation", "factor": 8})),
+]
+
+# (operation, params) -> expected error detail substring
+ERROR_CASES = [
+    ("upscale", {"factor": 3}, "one of 2, 4, 8"),
+    ("denoise", {"level": "x"}, "one of light, medium, heavy"),
+    ("detect_objects", {"scene_threshold": "abc"}, "scene_threshold must be numeric"),
+    ("detect_objects", {"scene_threshold": 120}, "between 0 and 100"),
+    ("detect_objects", {"temporal_window": 0}, "between 1 and 12"),
+    ("denoise", {"preset": "random"}, "preset must be one of"),
+    ("abc", {}, "Unsupported operation"),
+]
+
+for operation, params, expected in CASES:
+    assert_equal(normalize_job_params(operation, params), expected, f"{operation} {params}")
+
+for operation, params, contains in ERROR_CASES:
+    assert_raises(lambda op=operation, p=params: normalize_job_params(op, p), contains)
 
 print("[test-job-params] passed")
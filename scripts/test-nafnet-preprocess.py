@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+import threading
+from pathlib import Path
+
+NAFNET_PATH = Path(__file__).resolve().parents[1] / "backend" / "app" / "models" / "nafnet.py"
+
+# Same shape for both threads: that is the case where staging buffers collide
+SHAPE = (64, 96, 3)
+ROUNDS = 50
+
+try:
+    import numpy as np
+    import torch
+except ImportError as exc:
+    print(f"[test-nafnet-preprocess] skipped: {exc}")
+    sys.exit(0)
+
+if not torch.cuda.is_available():
+    print("[test-nafnet-preprocess] skipped: CUDA is not available")
+    sys.exit(0)
+
+
+def load_nafnet_class():
+    spec = importlib.util.spec_from_file_location("_nafnet_under_test", NAFNET_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.NAFNet
+
+
+NAFNet = load_nafnet_class()
+# Weights are not needed for _preprocess; a missing path leaves the model untrained
+model = NAFNet(str(NAFNET_PATH.with_name("missing.pth")), device="cuda")
+assert model.device == "cuda", "expected the CUDA preprocessing path"
+
+barrier = threading.Barrier(2)
+errors: list[str] = []
+
+
+def worker(value: int) -> None:
+    image = np.full(SHAPE, value, dtype=np.uint8)
+    expected = value / 255.0
+    barrier.wait()
+    for n in range(ROUNDS):
+        tensor = model._preprocess(image)
+        actual = tensor.float().cpu()
+        if tuple(actual.shape) != (1, 3, SHAPE[0], SHAPE[1]):
+            errors.append(f"value {value} round {n}: shape {tuple(actual.shape)}")
+            return
+        if not torch.allclose(actual, torch.full_like(actual, expected), atol=1e-3):
+            errors.append(f"value {value} round {n}: got mean {actual.mean().item():.4f}, expected {expected:.4f}")
+            return
+
+
+threads = [threading.Thread(target=worker, args=(value,)) for value in (40, 200)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+
+if errors:
+    raise AssertionError("; ".join(errors))
+
+print("[test-nafnet-preprocess] passed")
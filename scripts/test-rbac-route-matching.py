@@ -3,44 +3,57 @@
 from __future__ import annotations
 
 import ast
-import re
-from enum import Enum
+import sys
 from functools import lru_cache
 from pathlib import Path
 
+from _ast_cache import exec_slice, load_tree
 
-class UserRole(Enum):
-    viewer = "viewer"
-    analyst = "analyst"
-    admin = "admin"
+RBAC_PATH = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "rbac.py"
+RBAC_PATH_STR = str(RBAC_PATH)
+SLICE_NAME = "_rbac_slice_endpoint_roles"
 
 
+@lru_cache(maxsize=1)
 def load_endpoint_matcher():
-    rbac_path = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "rbac.py"
-    source = rbac_path.read_text(encoding="utf-8")
-    tree = ast.parse(source)
+    if SLICE_NAME in sys.modules:
+        return sys.modules[SLICE_NAME].endpoint_required_role
+
+    # Only the exec'd rbac code needs these: importing the script stays cheap
+    import re
+    from enum import Enum
+
+    tree = load_tree(RBAC_PATH)
 
     wanted_assigns = {"ENDPOINT_ROLES"}
     wanted_funcs = {"_compiled_endpoint_patterns", "endpoint_required_role"}
+    remaining = wanted_assigns | wanted_funcs
 
+    # Locals: class patterns resolve with LOAD_FAST instead of ast.<attr> per node
+    Assign, FunctionDef, Name = ast.Assign, ast.FunctionDef, ast.Name
     selected = []
     for node in tree.body:
-        if isinstance(node, ast.Assign):
-            target_ids = {t.id for t in node.targets if isinstance(t, ast.Name)}
-            if target_ids & wanted_assigns:
+        match node:
+            case Assign(targets=[Name(id=name)]) if name in wanted_assigns:
+                selected.append(node)
+            case FunctionDef(name=name) if name in wanted_funcs:
                 selected.append(node)
-        elif isinstance(node, ast.FunctionDef) and node.name in wanted_funcs:
-            selected.append(node)
+            case _:
+                continue
+        remaining.discard(name)
+        if not remaining:
+            break
+
+    if remaining:
+        raise RuntimeError(f"Missing rbac symbol(s): {sorted(remaining)}")
 
     module = ast.Module(body=selected, type_ignores=[])
-    ast.fix_missing_locations(module)
     namespace = {
-        "UserRole": UserRole,
+        "UserRole": Enum("UserRole", {"viewer": "viewer", "analyst": "analyst", "admin": "admin"}),
         "lru_cache": lru_cache,
         "re": re,
     }
-    exec(compile(module, str(rbac_path), "exec"), namespace)
-    return namespace["endpoint_required_role"]
+    return exec_slice(SLICE_NAME, module, RBAC_PATH_STR, namespace).endpoint_required_role
 
 
 def assert_equal(actual, expected, msg):
@@ -50,31 +63,21 @@ def assert_equal(actual, expected, msg):
 
 endpoint_required_role = load_endpoint_matcher()
 
-# exact match
-assert_equal(endpoint_required_role("GET", "/api/enterprise/reports/manifest"), "analyst", "manifest role")
-
-# trailing slash normalization
-assert_equal(endpoint_required_role("GET", "/api/enterprise/reports/manifest/"), "analyst", "manifest trailing slash")
-
-assert_equal(endpoint_required_role("GET", "/api/enterprise/reports/manifest.csv"), "analyst", "manifest csv role")
-
-# templated route matching
-assert_equal(
-    endpoint_required_role("GET", "/api/enterprise/reports/users/42/activity"),
-    "admin",
-    "templated user activity role",
-)
-assert_equal(
-    endpoint_required_role("PATCH", "/api/enterprise/users/77/role"),
-    "admin",
-    "templated enterprise user role patch",
-)
-
-# known analyst route
-assert_equal(endpoint_required_role("GET", "/api/system/gpu"), "analyst", "gpu endpoint role")
-
-# unknown route should stay unrestricted in middleware map
-assert_equal(endpoint_required_role("DELETE", "/api/enterprise/reports/manifest"), None, "unknown method")
-assert_equal(endpoint_required_role("GET", "/api/not-registered"), None, "unknown path")
+# (method, path, expected role, description)
+CASES = [
+    ("GET", "/api/enterprise/reports/manifest", "analyst", "manifest role"),
+    ("GET", "/api/enterprise/reports/manifest/", "analyst", "manifest trailing slash"),
+    ("GET", "/api/enterprise/reports/manifest.csv", "analyst", "manifest csv role"),
+    # templated route matching
+    ("GET", "/api/enterprise/reports/users/42/activity", "admin", "templated user activity role"),
+    ("PATCH", "/api/enterprise/users/77/role", "admin", "templated enterprise user role patch"),
+    ("GET", "/api/system/gpu", "analyst", "gpu endpoint role"),
+    # unknown route should stay unrestricted in middleware map
+    ("DELETE", "/api/enterprise/reports/manifest", None, "unknown method"),
+    ("GET", "/api/not-registered", None, "unknown path"),
+]
+
+for method, path, expected, msg in CASES:
+    assert_equal(endpoint_required_role(method, path), expected, msg)
 
 print("[test-rbac-route-matching] passed")
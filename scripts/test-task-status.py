@@ -3,28 +3,27 @@
 from __future__ import annotations
 
 import ast
+import sys
+from functools import lru_cache
 from pathlib import Path
 
+from _ast_cache import exec_slice, load_blocks
 
-def load_mapper():
-    routes_path = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "routes.py"
-    source = routes_path.read_text(encoding="utf-8")
-    tree = ast.parse(source)
+ROUTES_PATH = Path(__file__).resolve().parents[1] / "backend" / "app" / "api" / "routes.py"
+ROUTES_PATH_STR = str(ROUTES_PATH)
+SLICE_NAME = "_routes_slice_task_status"
 
-    node = None
-    for candidate in tree.body:
-        if isinstance(candidate, ast.FunctionDef) and candidate.name == "_to_task_status":
-            node = candidate
-            break
 
-    if node is None:
-        raise RuntimeError("_to_task_status not found")
+@lru_cache(maxsize=1)
+def load_mapper():
+    if SLICE_NAME in sys.modules:
+        return sys.modules[SLICE_NAME]._to_task_status
 
-    module = ast.Module(body=[node], type_ignores=[])
-    ast.fix_missing_locations(module)
-    namespace = {"Dict": dict, "Any": object, "AsyncResult": object}
-    exec(compile(module, str(routes_path), "exec"), namespace)
-    return namespace["_to_task_status"]
+    # Only the state table and the mapper are parsed, not the whole router module
+    selected = load_blocks(ROUTES_PATH, b"TASK_STATE_MAP", b"UNKNOWN_TASK_STATE", b"def _to_task_status(")
+    module = ast.Module(body=selected, type_ignores=[])
+    namespace = {"Dict": dict, "Any": object, "Tuple": tuple, "AsyncResult": object}
+    return exec_slice(SLICE_NAME, module, ROUTES_PATH_STR, namespace)._to_task_status
 
 
 def assert_equal(actual, expected, msg):
@@ -41,40 +40,34 @@ class DummyAsyncResult:
 
 mapper = load_mapper()
 
-pending = mapper(DummyAsyncResult("PENDING"), "task-1")
-assert_equal(pending["status"], "pending", "pending status")
-assert_equal(pending["progress"], 0, "pending progress")
-assert_equal(pending["is_final"], False, "pending non-final")
-assert_equal(pending["poll_after_ms"], 700, "pending poll")
-
-received = mapper(DummyAsyncResult("RECEIVED"), "task-2")
-assert_equal(received["status"], "queued", "received mapped")
-assert_equal(received["poll_after_ms"], 700, "received poll")
-
-progressed = mapper(DummyAsyncResult("PROGRESS", info={"progress": 55, "stage": "detect", "message": "running"}), "task-3")
-assert_equal(progressed["status"], "running", "progress mapped")
-assert_equal(progressed["progress"], 55, "progress carried")
-assert_equal(progressed["meta"]["stage"], "detect", "meta stage")
-assert_equal(progressed["is_final"], False, "progress non-final")
-
-finished = mapper(DummyAsyncResult("SUCCESS", result={"ok": True}), "task-4")
-assert_equal(finished["status"], "done", "success mapped")
-assert_equal(finished["progress"], 100, "success progress")
-assert_equal(finished["result"], {"ok": True}, "success payload")
-assert_equal(finished["is_final"], True, "success final")
-assert_equal(finished["poll_after_ms"], 0, "success no poll")
-
-failed = mapper(DummyAsyncResult("FAILURE", result=RuntimeError("boom")), "task-5")
-assert_equal(failed["status"], "failed", "failure mapped")
-assert "boom" in failed["error"], "failure error string"
-assert_equal(failed["is_final"], True, "failure final")
-
-canceled = mapper(DummyAsyncResult("REVOKED", result="killed"), "task-6")
-assert_equal(canceled["status"], "canceled", "revoked mapped")
-assert_equal(canceled["is_final"], True, "revoked final")
-
-retry = mapper(DummyAsyncResult("RETRY"), "task-7")
-assert_equal(retry["status"], "retry", "retry mapped")
-assert_equal(retry["poll_after_ms"], 900, "retry poll")
+# (state, result, info) -> expected subset of the mapped payload
+CASES = [
+    ("PENDING", None, None, {"status": "pending", "progress": 0, "is_final": False, "poll_after_ms": 700}),
+    ("RECEIVED", None, None, {"status": "queued", "poll_after_ms": 700}),
+    (
+        "PROGRESS",
+        None,
+        {"progress": 55, "stage": "detect", "message": "running"},
+        {"status": "running", "progress": 55, "is_final": False},
+    ),
+    (
+        "SUCCESS",
+        {"ok": True},
+        None,
+        {"status": "done", "progress": 100, "result": {"ok": True}, "is_final": True, "poll_after_ms": 0},
+    ),
+    ("FAILURE", RuntimeError("boom"), None, {"status": "failed", "is_final": True}),
+    ("REVOKED", "killed", None, {"status": "canceled", "is_final": True}),
+    ("RETRY", None, None, {"status": "retry", "poll_after_ms": 900}),
+]
+
+mapped = {}
+for n, (state, result, info, expected) in enumerate(CASES, start=1):
+    payload = mapped[state] = mapper(DummyAsyncResult(state, result=result, info=info), f"task-{n}")
+    for key, value in expected.items():
+        assert_equal(payload[key], value, f"{state} {key}")
+
+assert_equal(mapped["PROGRESS"]["meta"]["stage"], "detect", "meta stage")
+assert "boom" in mapped["FAILURE"]["error"], "failure error string"
 
 print("[test-task-status] passed")